@@ -3,168 +3,206 @@ Alignment Engine Module
 Analyzes resume bullets against job description and embedding store
 """
 
-from typing import List, Dict, Tuple
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, Iterable, Pattern
 import numpy as np
 from faiss import normalize_L2
 
 
+# Decision -> integer code, indexing into _WEIGHT_TABLE (unknown decisions use the last slot)
+_DECISION_CODE = {"KEEP": 0, "REWRITE": 1, "DE_EMPHASIZE": 2}
+_WEIGHT_TABLE = np.array([1.0, 0.6, 0.2, 0.5])
+
+# Shared reasoning for de-emphasized bullets; detailed reasoning is only built for KEEP/REWRITE
+_DE_EMPHASIZE_REASONING = "Decision: DE_EMPHASIZE because scores are below thresholds"
+
+
 class AlignmentEngine:
     """Analyzes and aligns resume bullets with job description"""
     
     def __init__(self, embedding_store, similarity_threshold: float = 0.6,
-                 rewrite_threshold: float = 0.4, keep_threshold: float = 0.75):
+                 rewrite_threshold: float = 0.4, keep_threshold: float = 0.75,
+                 prefilter_max_length: int = 0):
         self.embedding_store = embedding_store
         self.similarity_threshold = similarity_threshold
         self.rewrite_threshold = rewrite_threshold
         self.keep_threshold = keep_threshold
+        # Bullets shorter than this with no keyword/profile overlap skip full analysis (0 disables)
+        self.prefilter_max_length = prefilter_max_length
         
         # Embed job description for comparison
         self.jd_embedding = None
         self.jd_keywords = ""
+        self._jd_token_set = frozenset()
+        self._jd_len = 0
     
     def set_job_description(self, jd_keywords: str):
         """Set job description keywords for comparison"""
         self.jd_keywords = jd_keywords
+        # Tokenize JD once for keyword overlap checks
+        self._jd_token_set = frozenset(jd_keywords.lower().split())
+        self._jd_len = len(self._jd_token_set)
         # Embed JD for similarity search
-        self.jd_embedding = self.embedding_store.model.encode(
-            [jd_keywords], 
-            convert_to_numpy=True
-        )
+        jd_embedding = self.embedding_store.encode([jd_keywords])
         # Normalize for cosine similarity
-        from faiss import normalize_L2
-        normalize_L2(self.jd_embedding)
+        normalize_L2(jd_embedding)
+        # Keep a flat, C-contiguous (d,) vector so the GEMV never goes through a row view
+        self.jd_embedding = np.ascontiguousarray(jd_embedding[0], dtype=np.float32)
     
     def analyze_bullet(self, bullet: Dict, user_profile_data: Dict = None, 
                       match_analysis: Dict = None) -> Dict:
         """
         Analyze a single bullet point
-        Returns decision: KEEP, REWRITE, ADD, or DE_EMPHASIZE
+        Returns decision: KEEP, REWRITE, or DE_EMPHASIZE
+        """
+        # Same batched path as analyze_all_bullets, with N=1
+        return self.analyze_all_bullets([bullet], user_profile_data, match_analysis)[0]
+    
+    def _extract_text_features(self, bullet: Dict, bullet_lower: str, bullet_tokens: List[str],
+                               prepared: Optional[Dict] = None) -> Dict:
+        """
+        Collect the text-only signals that feed the decision (no embeddings needed)
+        bullet_lower / bullet_tokens: the bullet's lower-cased text and its words
+        prepared: match analysis normalized by _prepare_match_analysis
         """
-        bullet_text = bullet["text"]
-        
-        # 1. Check similarity to job description
-        jd_similarity = self._calculate_jd_similarity(bullet_text)
-        
-        # 2. Find relevant user profile entries
-        relevant_entries = self.embedding_store.get_relevant_entries(
-            bullet_text, 
-            threshold=self.similarity_threshold,
-            top_k=5
-        )
-        
-        # 3. Check if bullet has supporting evidence in profile
-        has_evidence = len(relevant_entries) > 0
-        
         # 4. Check keyword overlap
-        keyword_score = self._calculate_keyword_overlap(bullet_text)
+        keyword_score = self._calculate_keyword_overlap(bullet["text"], bullet_tokens)
         
         # 5. Use match analysis to understand if this aligns with profile strengths
         profile_alignment = 0.0
         should_emphasize = False
         should_add = False
         
-        if match_analysis:
-            # Check if bullet mentions a matched skill
-            for skill, evidence in match_analysis.get("skill_matches", {}).items():
-                if skill.lower() in bullet_text.lower():
-                    profile_alignment = 0.8
-                    should_emphasize = True
-                    break
+        if prepared:
+            # Check if bullet mentions a matched skill (single scan for all skills)
+            skill_pattern = prepared["skill_pattern"]
+            if skill_pattern is not None and skill_pattern.search(bullet_lower):
+                profile_alignment = 0.8
+                should_emphasize = True
             
             # Check if bullet could be enhanced based on recommendations
-            for rec in match_analysis.get("recommendations", []):
-                skill_or_topic = rec.get("skill_or_topic", "").lower()
-                action = rec.get("action", "")
-                if skill_or_topic and skill_or_topic in bullet_text.lower():
-                    if action == "EMPHASIZE":
-                        should_emphasize = True
-                        profile_alignment = max(profile_alignment, 0.7)
-                    elif action == "ADD":
-                        # This might be a new bullet to add
-                        should_add = True
-        
-        # 6. Make decision (enhanced with profile analysis)
-        decision = self._make_decision(jd_similarity, has_evidence, keyword_score, 
-                                      profile_alignment, should_emphasize, should_add)
-        
-        analysis = {
-            "bullet": bullet,
-            "jd_similarity": float(jd_similarity),
-            "has_evidence": has_evidence,
-            "relevant_entries": relevant_entries[:3],  # Top 3
+            emphasize_pattern = prepared["emphasize_pattern"]
+            if emphasize_pattern is not None and emphasize_pattern.search(bullet_lower):
+                should_emphasize = True
+                profile_alignment = max(profile_alignment, 0.7)
+            
+            add_pattern = prepared["add_pattern"]
+            if add_pattern is not None and add_pattern.search(bullet_lower):
+                # This might be a new bullet to add
+                should_add = True
+        
+        return {
             "keyword_score": float(keyword_score),
             "profile_alignment": float(profile_alignment),
             "should_emphasize": should_emphasize,
+            "should_add": should_add
+        }
+    
+    @staticmethod
+    def _compile_matcher(terms: Iterable[str]) -> Optional[Pattern]:
+        """Compile lower-cased terms into one alternation regex, longest first"""
+        terms = sorted({term for term in terms if term}, key=len, reverse=True)
+        if not terms:
+            return None
+        return re.compile("|".join(map(re.escape, terms)))
+    
+    def _prepare_match_analysis(self, match_analysis: Dict = None) -> Optional[Dict]:
+        """Lower-case skills and recommendations once per match analysis, not per bullet"""
+        if not match_analysis:
+            return None
+        recommendations = match_analysis.get("recommendations", [])
+        return {
+            "skill_pattern": self._compile_matcher(
+                skill.lower() for skill in match_analysis.get("skill_matches", {})
+            ),
+            # Recommendation topics per action, each scanned in one regex pass
+            "emphasize_pattern": self._compile_matcher(
+                rec.get("skill_or_topic", "").lower() for rec in recommendations
+                if rec.get("action", "") == "EMPHASIZE"
+            ),
+            "add_pattern": self._compile_matcher(
+                rec.get("skill_or_topic", "").lower() for rec in recommendations
+                if rec.get("action", "") == "ADD"
+            ),
+            "rec_pattern": self._compile_matcher(
+                rec.get("skill_or_topic", "").lower() for rec in recommendations
+            )
+        }
+    
+    def _build_analysis(self, bullet: Dict, features: Dict, decision: str) -> Dict:
+        """Assemble the analysis dict returned to callers"""
+        return {
+            "bullet": bullet,
+            "jd_similarity": features["jd_similarity"],
+            "has_evidence": features["has_evidence"],
+            "relevant_entries": features["relevant_entries"][:3],  # Top 3
+            "keyword_score": features["keyword_score"],
+            "profile_alignment": features["profile_alignment"],
+            "should_emphasize": features["should_emphasize"],
             "decision": decision,
-            "reasoning": self._generate_reasoning(jd_similarity, has_evidence, keyword_score, 
-                                                 decision, profile_alignment)
+            "reasoning": _DE_EMPHASIZE_REASONING if decision == "DE_EMPHASIZE" else
+                         self._generate_reasoning(features["jd_similarity"], features["has_evidence"],
+                                                  features["keyword_score"], decision,
+                                                  features["profile_alignment"])
         }
-        
-        return analysis
     
-    def _calculate_jd_similarity(self, bullet_text: str) -> float:
-        """Calculate similarity between bullet and job description"""
+    def _embed_bullets(self, bullets: List[Dict]) -> np.ndarray:
+        """Encode all bullets in one batched call, returning an L2-normalized (N, d) matrix"""
+        # Bullets already seen (e.g. the same resume against another JD) skip the encoder
+        embeddings = self.embedding_store.encode_cached([b["text"] for b in bullets], batch_size=64)
+        normalize_L2(embeddings)
+        return embeddings
+    
+    def _calculate_jd_similarities(self, embeddings: np.ndarray) -> np.ndarray:
+        """Similarity of every normalized bullet row against the JD in a single GEMV"""
         if self.jd_embedding is None:
-            return 0.0
-        
-        # Encode bullet
-        bullet_embedding = self.embedding_store.model.encode(
-            [bullet_text],
-            convert_to_numpy=True
-        )
-        normalize_L2(bullet_embedding)
-        
-        # Cosine similarity (dot product after normalization)
-        similarity = np.dot(self.jd_embedding[0], bullet_embedding[0])
+            return np.zeros(len(embeddings), dtype=np.float32)
         
-        return max(0.0, min(1.0, similarity))  # Clamp to [0, 1]
+        similarities = embeddings @ self.jd_embedding
+        return np.clip(similarities, 0.0, 1.0)  # Clamp to [0, 1]
     
-    def _calculate_keyword_overlap(self, bullet_text: str) -> float:
+    def _calculate_keyword_overlap(self, bullet_text: str,
+                                   bullet_tokens: Optional[List[str]] = None) -> float:
         """Calculate keyword overlap score (simple word matching)"""
-        if not self.jd_keywords:
+        if not self._jd_len:
             return 0.0
         
-        bullet_words = set(bullet_text.lower().split())
-        jd_words = set(self.jd_keywords.lower().split())
-        
-        if not jd_words:
-            return 0.0
+        if bullet_tokens is None:
+            bullet_tokens = bullet_text.lower().split()
         
-        overlap = len(bullet_words.intersection(jd_words))
-        return min(1.0, overlap / len(jd_words))  # Normalize
+        # Probe the cached JD token set with the bullet's words (unique matches only)
+        overlap = len(self._jd_token_set.intersection(bullet_tokens))
+        return min(1.0, overlap / self._jd_len)  # Normalize
     
-    def _make_decision(self, jd_similarity: float, has_evidence: bool, keyword_score: float,
-                      profile_alignment: float = 0.0, should_emphasize: bool = False,
-                      should_add: bool = False) -> str:
+    def _make_decisions(self, jd_similarity: np.ndarray, has_evidence: np.ndarray,
+                        keyword_score: np.ndarray, profile_alignment: np.ndarray,
+                        should_emphasize: np.ndarray) -> List[str]:
         """
-        Make decision: KEEP, REWRITE, ADD, or DE_EMPHASIZE
-        Enhanced with profile analysis
+        Decide KEEP, REWRITE, or DE_EMPHASIZE for every bullet at once
+        Enhanced with profile analysis; inputs are (N,) feature columns
         """
         # Combined score with profile alignment
         combined_score = (
-            jd_similarity * 0.4 + 
-            keyword_score * 0.25 + 
-            (0.8 if has_evidence else 0.2) * 0.2 +
+            jd_similarity * 0.4 +
+            keyword_score * 0.25 +
+            np.where(has_evidence, 0.8, 0.2) * 0.2 +
             profile_alignment * 0.15
         )
-        
         # If should emphasize based on profile strengths, prioritize keeping/rewriting
-        if should_emphasize and has_evidence:
-            if jd_similarity >= self.keep_threshold * 0.9:
-                return "KEEP"
-            else:
-                return "REWRITE"  # Rewrite to emphasize profile strengths
-        
-        if should_add and not has_evidence:
-            # This might be a new bullet to add, but we'll handle this separately
-            pass
-        
-        if combined_score >= self.keep_threshold and jd_similarity >= self.keep_threshold:
-            return "KEEP"
-        elif combined_score >= self.rewrite_threshold:
-            return "REWRITE"
-        else:
-            return "DE_EMPHASIZE"
+        emphasize = should_emphasize & has_evidence
+        
+        decisions = np.select(
+            [
+                emphasize & (jd_similarity >= self.keep_threshold * 0.9),
+                emphasize,
+                (combined_score >= self.keep_threshold) & (jd_similarity >= self.keep_threshold),
+                combined_score >= self.rewrite_threshold
+            ],
+            ["KEEP", "REWRITE", "KEEP", "REWRITE"],
+            default="DE_EMPHASIZE"
+        )
+        return decisions.tolist()
     
     def _generate_reasoning(self, jd_similarity: float, has_evidence: bool, 
                            keyword_score: float, decision: str,
@@ -197,43 +235,130 @@ class AlignmentEngine:
     def analyze_all_bullets(self, bullets: List[Dict], user_profile_data: Dict = None,
                            match_analysis: Dict = None) -> List[Dict]:
         """Analyze all bullets and return decisions, enhanced with profile match analysis"""
-        analyses = []
+        if not bullets:
+            return []
         
-        for bullet in bullets:
-            analysis = self.analyze_bullet(bullet, user_profile_data, match_analysis)
-            analyses.append(analysis)
+        # Lower-cased text and its tokens, computed once per bullet and kept off the caller's dicts
+        texts_lower = [bullet["text"].lower() for bullet in bullets]
+        tokens = [text.split() for text in texts_lower]
         
-        return analyses
+        prepared = self._prepare_match_analysis(match_analysis)
+        
+        # Cheap pre-filter: short bullets with no JD keyword or profile overlap
+        # are decided without paying for encoding or a FAISS lookup
+        candidates = [i for i, bullet in enumerate(bullets)
+                      if not self._is_clearly_irrelevant(bullet, texts_lower[i], tokens[i], prepared)]
+        candidate_bullets = [bullets[i] for i in candidates]
+        
+        features = [self._prefiltered_features() for _ in bullets]
+        decisions = ["DE_EMPHASIZE"] * len(bullets)
+        
+        if candidate_bullets:
+            # Fused pass: encode every remaining bullet in a single batched forward pass,
+            # then score all of them against the JD with one matrix-vector product
+            embeddings = self._embed_bullets(candidate_bullets)
+            jd_similarities = self._calculate_jd_similarities(embeddings)
+            
+            # One FAISS search over the same embedding matrix for profile evidence. FAISS
+            # releases the GIL, so run it in the background while the Python-side
+            # keyword and skill scoring proceeds on this thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                search = executor.submit(
+                    self.embedding_store.get_relevant_entries_batch,
+                    [b["text"] for b in candidate_bullets],
+                    threshold=self.similarity_threshold,
+                    top_k=5,
+                    query_embeddings=embeddings
+                )
+                text_features = [self._extract_text_features(bullets[i], texts_lower[i], tokens[i], prepared)
+                                 for i in candidates]
+                relevant_entries = search.result()
+            
+            candidate_features = [
+                dict(bullet_features,
+                     jd_similarity=float(jd_similarity),
+                     relevant_entries=entries,
+                     has_evidence=len(entries) > 0)
+                for bullet_features, jd_similarity, entries
+                in zip(text_features, jd_similarities, relevant_entries)
+            ]
+            
+            # Decide for all candidates at once on (N,) feature columns
+            count = len(candidate_features)
+            candidate_decisions = self._make_decisions(
+                np.fromiter((f["jd_similarity"] for f in candidate_features), dtype=np.float64, count=count),
+                np.fromiter((f["has_evidence"] for f in candidate_features), dtype=bool, count=count),
+                np.fromiter((f["keyword_score"] for f in candidate_features), dtype=np.float64, count=count),
+                np.fromiter((f["profile_alignment"] for f in candidate_features), dtype=np.float64, count=count),
+                np.fromiter((f["should_emphasize"] for f in candidate_features), dtype=bool, count=count)
+            )
+            
+            for i, bullet_features, decision in zip(candidates, candidate_features, candidate_decisions):
+                features[i] = bullet_features
+                decisions[i] = decision
+        
+        return [
+            self._build_analysis(bullet, bullet_features, decision)
+            for bullet, bullet_features, decision in zip(bullets, features, decisions)
+        ]
+    
+    def _is_clearly_irrelevant(self, bullet: Dict, bullet_lower: str, bullet_tokens: List[str],
+                               prepared: Optional[Dict] = None) -> bool:
+        """True for short bullets with no JD keyword overlap and no profile match"""
+        bullet_text = bullet["text"]
+        if len(bullet_text) >= self.prefilter_max_length:
+            return False
+        
+        if self._calculate_keyword_overlap(bullet_text, bullet_tokens) > 0:
+            return False
+        
+        if prepared:
+            skill_pattern = prepared["skill_pattern"]
+            if skill_pattern is not None and skill_pattern.search(bullet_lower):
+                return False
+            rec_pattern = prepared["rec_pattern"]
+            if rec_pattern is not None and rec_pattern.search(bullet_lower):
+                return False
+        
+        return True
+    
+    @staticmethod
+    def _prefiltered_features() -> Dict:
+        """Features for a bullet skipped by the pre-filter"""
+        return {
+            "jd_similarity": 0.0,
+            "relevant_entries": [],
+            "has_evidence": False,
+            "keyword_score": 0.0,
+            "profile_alignment": 0.0,
+            "should_emphasize": False,
+            "should_add": False
+        }
     
     def calculate_role_match_score(self, analyses: List[Dict]) -> float:
         """Calculate overall role match score (0-100)"""
         if not analyses:
             return 0.0
         
-        # Weight scores by decision
-        decision_weights = {
-            "KEEP": 1.0,
-            "REWRITE": 0.6,
-            "DE_EMPHASIZE": 0.2
-        }
+        count = len(analyses)
+        jd_similarity = np.fromiter((a["jd_similarity"] for a in analyses), dtype=np.float64, count=count)
+        keyword_score = np.fromiter((a["keyword_score"] for a in analyses), dtype=np.float64, count=count)
+        has_evidence = np.fromiter((a["has_evidence"] for a in analyses), dtype=bool, count=count)
         
-        total_score = 0.0
-        total_weight = 0.0
+        # Weight scores by decision with a single gather from the weight table
+        codes = np.fromiter((_DECISION_CODE.get(a["decision"], 3) for a in analyses),
+                            dtype=np.int8, count=count)
+        weights = _WEIGHT_TABLE[codes]
         
-        for analysis in analyses:
-            weight = decision_weights.get(analysis["decision"], 0.5)
-            bullet_score = (
-                analysis["jd_similarity"] * 0.5 +
-                analysis["keyword_score"] * 0.3 +
-                (0.8 if analysis["has_evidence"] else 0.2) * 0.2
-            )
-            
-            total_score += bullet_score * weight
-            total_weight += weight
+        bullet_scores = (
+            jd_similarity * 0.5 +
+            keyword_score * 0.3 +
+            np.where(has_evidence, 0.8, 0.2) * 0.2
+        )
         
+        total_weight = weights.sum()
         if total_weight == 0:
             return 0.0
         
-        average_score = total_score / total_weight
+        average_score = float((bullet_scores * weights).sum() / total_weight)
         return round(average_score * 100, 2)
-
@@ -0,0 +1,58 @@
+"""
+Batch API Module
+Runs chat completion requests through the OpenAI Batch API for non-interactive bulk jobs
+"""
+
+import json
+import time
+from typing import Dict, Optional
+
+# Batch states after which polling stops
+_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def run_chat_batch(client, requests: Dict[str, Dict], poll_interval: float = 30.0,
+                   timeout: Optional[float] = None) -> Dict[str, str]:
+    """
+    Submit chat completion requests as one batch and wait for it to finish
+    requests: custom_id -> chat.completions.create keyword arguments
+    Returns custom_id -> message content; requests that failed inside the batch are absent
+    """
+    if not requests:
+        return {}
+    
+    lines = [
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body})
+        for custom_id, body in requests.items()
+    ]
+    batch_file = client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"  Submitted batch {batch.id} with {len(requests)} requests")
+    
+    deadline = time.time() + timeout if timeout is not None else None
+    while batch.status not in _TERMINAL_STATUSES:
+        if deadline is not None and time.time() > deadline:
+            client.batches.cancel(batch.id)
+            raise TimeoutError(f"Batch {batch.id} did not finish within {timeout} seconds")
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+    
+    if batch.status != "completed":
+        raise Exception(f"Batch {batch.id} ended with status {batch.status}")
+    
+    results = {}
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                results[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    
+    print(f"  Batch {batch.id} completed: {len(results)}/{len(requests)} requests succeeded")
+    return results
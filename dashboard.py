@@ -4,17 +4,26 @@ Interactive web interface for resume optimization
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
 import os
 import json
+import hashlib
+import time
 from pathlib import Path
 from datetime import datetime
 import sys
+import contextlib
+from collections import Counter
+from types import SimpleNamespace
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from main import ATSResumeOptimizer
-from profile_ingester import ProfileIngester
+# Only the optional in-app profiling needs pyinstrument; without it the checkbox is disabled
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
 
 
 # Page configuration
@@ -89,6 +98,263 @@ def initialize_session_state():
         st.session_state.resume_path = None
     if 'output_folder' not in st.session_state:
         st.session_state.output_folder = None
+    if 'session_identity' not in st.session_state:
+        st.session_state.session_identity = None
+
+
+# Session keys persisted across page reloads, and where they are saved
+SESSION_SNAPSHOT_KEYS = ("profile_data", "profile_capabilities", "results", "github_repo", "output_folder")
+SESSION_SNAPSHOT_DIR = os.path.join("output", "sessions")
+SESSION_SNAPSHOT_MAX_AGE = 24 * 60 * 60  # seconds
+
+
+def _session_identity(github_token: str, github_user: str):
+    """
+    Snapshot key for a user; the GitHub token is part of it so another visitor entering
+    the same username cannot load someone else's run. None until both are entered.
+    """
+    if not github_token or not github_user:
+        return None
+    return hashlib.sha256(f"{github_token}|{github_user}".encode("utf-8")).hexdigest()[:32]
+
+
+def _snapshot_path(identity: str) -> str:
+    return os.path.join(SESSION_SNAPSHOT_DIR, f"{identity}.json")
+
+
+def _save_session(identity: str):
+    """Persist the whitelisted session keys to this user's snapshot"""
+    if not identity:
+        return
+    try:
+        os.makedirs(SESSION_SNAPSHOT_DIR, exist_ok=True)
+        snapshot = {key: st.session_state.get(key) for key in SESSION_SNAPSHOT_KEYS}
+        with open(_snapshot_path(identity), 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, default=str)
+    except Exception as e:
+        print(f"Warning: Could not save session snapshot: {e}")
+
+
+def _restore_session(identity: str):
+    """Load the whitelisted session keys from this user's snapshot if it is less than a day old"""
+    path = _snapshot_path(identity)
+    try:
+        if time.time() - os.path.getmtime(path) > SESSION_SNAPSHOT_MAX_AGE:
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        print(f"Warning: Could not restore session snapshot: {e}")
+        return
+    
+    for key in SESSION_SNAPSHOT_KEYS:
+        if snapshot.get(key) is not None:
+            st.session_state[key] = snapshot[key]
+
+
+def _switch_session_identity(identity):
+    """Restore a user's last run (e.g. after a page reload) once they have identified themselves"""
+    if identity == st.session_state.session_identity:
+        return
+    if st.session_state.session_identity is not None:
+        # A different user: drop the previous one's results before loading theirs
+        for key in SESSION_SNAPSHOT_KEYS:
+            st.session_state[key] = None
+    st.session_state.session_identity = identity
+    if identity:
+        _restore_session(identity)
+
+
+@st.cache_resource(show_spinner=False)
+def _lazy_imports() -> SimpleNamespace:
+    """Import the heavy pipeline modules (torch, faiss, OpenAI) on first use, not at startup"""
+    from main import ATSResumeOptimizer, write_json_atomic
+    from github_integration import GitHubIntegration
+    return SimpleNamespace(ATSResumeOptimizer=ATSResumeOptimizer, GitHubIntegration=GitHubIntegration,
+                           write_json_atomic=write_json_atomic)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4, ttl="12h")
+def get_optimizer(settings_hash: str, _settings: dict):
+    """
+    Build the shared components (embedding model, HTTP pool) once per unique non-secret settings
+    Shared by every session, so runs use optimizer.for_run(config) with their own credentials
+    """
+    optimizer = _lazy_imports().ATSResumeOptimizer.from_dict(_settings)
+    # Build them now so every run's copy shares them instead of building its own
+    optimizer.http_client
+    optimizer.embedding_store
+    return optimizer
+
+
+@st.cache_resource(show_spinner=False)
+def get_github_integration(token: str, owner: str, name: str, branch: str):
+    """Share one GitHub client (and its pooled HTTPS connection) per repo across reruns"""
+    gh_integration = _lazy_imports().GitHubIntegration(token=token, repo_owner=owner, repo_name=name, branch=branch)
+    if gh_integration.repo is None:
+        # Raising keeps a failed lookup out of the cache so the next run retries
+        raise ValueError(f"Could not access GitHub repo {owner}/{name}")
+    return gh_integration
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _parse_repo_config(repo_url: str, branch: str, file_name: str) -> dict:
+    """Repo settings from a GitHub repo URL, or an empty dict if it isn't one"""
+    if "github.com" not in repo_url:
+        return {}
+    parts = repo_url.strip().replace("https://github.com/", "").replace("http://github.com/", "").split("/")
+    if len(parts) < 2:
+        return {}
+    return {
+        "owner": parts[0],
+        "name": parts[1].split(".git")[0].split("/")[0],
+        "branch": branch,
+        "file": file_name
+    }
+
+
+@st.cache_data(ttl="1h", max_entries=32, show_spinner=False)
+def _cached_ingest(github_username: str, scholar_id: str, author_name: str, _optimizer) -> dict:
+    """Ingest profile data, reusing results for the same identity for an hour"""
+    return _optimizer.step1_ingest_profile(scholar_id=scholar_id, author_name=author_name)
+
+
+@st.cache_data(ttl="1h", max_entries=32, show_spinner=False)
+def _cached_analyze_profile(profile_data: dict, _optimizer) -> dict:
+    """Analyze profile capabilities, reusing results for identical profile data"""
+    _optimizer.user_profile = profile_data
+    return _optimizer.step2b_analyze_profile()
+
+
+@st.fragment
+def _render_results_tab():
+    """Tab 3 body; runs as a fragment so its widgets don't rerun the whole app"""
+    if st.session_state.results is None:
+        st.info("👈 Complete Job Analysis (Tab 2) to see results")
+    else:
+        results = st.session_state.results
+        
+        st.markdown('<div class="section-header">Optimization Results</div>', unsafe_allow_html=True)
+        
+        # Match Score
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Role Match Score", f"{results['role_match_score']:.1f}%")
+        with col2:
+            rewritten = sum(1 for a in results['analyses'] if a.get('rewritten_text'))
+            st.metric("Bullets Rewritten", rewritten)
+        with col3:
+            total = len(results['analyses'])
+            st.metric("Total Bullets", total)
+        
+        # Match Analysis
+        if results.get('match_analysis'):
+            st.markdown("### Profile-Job Match Analysis")
+            
+            match_analysis = results['match_analysis']
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                if match_analysis.get('strengths'):
+                    st.markdown("#### ✅ Strengths")
+                    st.markdown("\n".join(f"- {strength}" for strength in match_analysis['strengths'][:10]))
+            
+            with col2:
+                if match_analysis.get('missing_skills'):
+                    st.markdown("#### ⚠️ Missing Skills")
+                    st.markdown("\n".join(f"- {skill}" for skill in match_analysis['missing_skills'][:10]))
+        
+        # Bullet Analysis
+        st.markdown("### Bullet Point Analysis")
+        
+        decisions = Counter(analysis['decision'] for analysis in results['analyses'])
+        
+        # Decision breakdown
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Keep", decisions.get('KEEP', 0))
+        with col2:
+            st.metric("Rewrite", decisions.get('REWRITE', 0))
+        with col3:
+            st.metric("De-emphasize", decisions.get('DE_EMPHASIZE', 0))
+        with col4:
+            st.metric("Add", decisions.get('ADD', 0))
+        
+        # Show rewritten bullets
+        rewritten_bullets = [a for a in results['analyses'] if a.get('rewritten_text')]
+        if rewritten_bullets:
+            st.markdown("#### Rewritten Bullets")
+            for i, bullet in enumerate(rewritten_bullets[:5], 1):
+                with st.expander(f"Bullet {i}: {bullet['bullet_text'][:60]}..."):
+                    st.markdown(
+                        f"**Original:**\n\n{bullet['bullet_text']}\n\n"
+                        f"**Rewritten:**\n\n{bullet['rewritten_text']}\n\n"
+                        f"**Reasoning:**\n\n{bullet['reasoning']}"
+                    )
+        
+        # Download results
+        st.markdown("### Download Results")
+        if hasattr(st.session_state, 'output_folder') and st.session_state.output_folder:
+            output_folder = st.session_state.output_folder
+            analysis_file = os.path.join(output_folder, "analysis_results.json")
+            try:
+                analysis_json = Path(analysis_file).read_text()
+            except FileNotFoundError:
+                analysis_json = None
+            if analysis_json is not None:
+                st.download_button("📥 Download Analysis JSON", analysis_json, 
+                                 "analysis_results.json", "application/json")
+
+
+@st.fragment
+def _render_resume_output_tab(resume_file_name: str):
+    """Tab 4 body; runs as a fragment so its widgets don't rerun the whole app"""
+    if st.session_state.results is None:
+        st.info("👈 Complete Job Analysis (Tab 2) to see resume output")
+    else:
+        if st.session_state.optimizer and st.session_state.optimizer.resume_parser:
+            st.markdown('<div class="section-header">Modified Resume</div>', unsafe_allow_html=True)
+            
+            # Show resume content
+            resume_content = st.session_state.optimizer.resume_parser.content
+            
+            # Read-only code view; very long files show the tail on demand
+            lines = resume_content.splitlines()
+            st.code("\n".join(lines[:1000]), language="latex")
+            if len(lines) > 1000:
+                with st.expander(f"Show remaining {len(lines) - 1000} lines"):
+                    st.code("\n".join(lines[1000:]), language="latex")
+            
+            # Download buttons
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("Download Resume (.tex)", resume_content,
+                                 "optimized_resume.tex", "text/plain")
+            
+            # Find saved resume file
+            if hasattr(st.session_state, 'output_folder') and st.session_state.output_folder:
+                output_folder = st.session_state.output_folder
+                resume_file_path = os.path.join(output_folder, resume_file_name)
+                try:
+                    resume_file_content = Path(resume_file_path).read_text()
+                except FileNotFoundError:
+                    resume_file_content = None
+                if resume_file_content is not None:
+                    with col2:
+                        st.download_button(f"📥 Download {resume_file_name}", resume_file_content,
+                                         resume_file_name, "text/plain")
+                
+                # Show output folder info
+                st.markdown("### Output Folder")
+                st.info(f"📁 All files saved in: `{output_folder}`")
+                st.code(f"""
+{output_folder}/
+├── analysis_results.json  # Changes, scores, analysis
+└── {resume_file_name}     # Modified resume
+                """)
 
 
 def main():
@@ -123,6 +389,10 @@ def main():
         st.subheader("Settings")
         rebuild_embeddings = st.checkbox("Rebuild Embeddings", value=False,
                                         help="Force rebuild of embedding store")
+        profile_enabled = st.checkbox("Enable pyinstrument profiling", value=False,
+                                     disabled=Profiler is None,
+                                     help="Show a pyinstrument call-tree report of the optimization run "
+                                          "(requires pyinstrument)")
         
         # Config file path
         config_path = st.text_input("Config File Path", value="config.yaml",
@@ -144,6 +414,9 @@ def main():
             github_profile_url = st.text_input("GitHub Profile URL (optional)",
                                               help="Alternative: Provide full GitHub profile URL")
         
+        session_identity = _session_identity(github_token, github_username or github_profile_url)
+        _switch_session_identity(session_identity)
+        
         with col2:
             st.subheader("Google Scholar")
             scholar_author_name = st.text_input("Author Name",
@@ -165,20 +438,12 @@ def main():
         resume_branch = st.text_input("Branch Name", value="main",
                                      help="GitHub branch to use")
         
-        # Store in session state
-        if resume_repo_url:
-            # Parse GitHub repo URL
-            if "github.com" in resume_repo_url:
-                parts = resume_repo_url.replace("https://github.com/", "").replace("http://github.com/", "").split("/")
-                if len(parts) >= 2:
-                    repo_owner = parts[0]
-                    repo_name = parts[1].split(".git")[0].split("/")[0]
-                    st.session_state.github_repo = {
-                        "owner": repo_owner,
-                        "name": repo_name,
-                        "branch": resume_branch,
-                        "file": resume_file_name
-                    }
+        # Parsed once per distinct input (cached across reruns); saved to session state when a run starts
+        repo_config = _parse_repo_config(resume_repo_url, resume_branch, resume_file_name) if resume_repo_url else {}
+        if repo_config:
+            st.caption(f"Using {repo_config['owner']}/{repo_config['name']} ({repo_config['branch']})")
+        elif resume_repo_url:
+            st.warning("⚠️ Enter a GitHub repo URL, e.g. https://github.com/username/resume-repo")
         
         # Button to ingest profile
         if st.button("🔍 Analyze Profile", type="primary", use_container_width=True):
@@ -189,6 +454,8 @@ def main():
             elif not github_username and not github_profile_url:
                 st.error("❌ Please provide GitHub username or profile URL")
             else:
+                if repo_config:
+                    st.session_state.github_repo = repo_config
                 with st.spinner("Analyzing your profile... This may take a few minutes."):
                     try:
                         # Initialize optimizer
@@ -199,31 +466,37 @@ def main():
                             "repository": st.session_state.github_repo or {}
                         }
                         
-                        # Save config temporarily
-                        import yaml
-                        temp_config_path = "temp_config.yaml"
-                        with open(temp_config_path, 'w') as f:
-                            yaml.dump(config, f)
-                        
-                        st.session_state.optimizer = ATSResumeOptimizer(temp_config_path)
+                        # Reuse the shared components for these settings (keyed without credentials);
+                        # API clients and the run's profile, JD and resume live on this session's copy
+                        settings = {k: v for k, v in config.items() if k not in ("github", "openai", "repository")}
+                        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+                        st.session_state.optimizer = get_optimizer(settings_hash, settings).for_run(config)
                         
                         # Step 1: Ingest profile
                         st.info("📥 Ingesting profile data from GitHub and Scholar...")
-                        profile_data = st.session_state.optimizer.step1_ingest_profile(
-                            scholar_id=scholar_id if scholar_id else None,
-                            author_name=scholar_author_name if scholar_author_name else None
+                        profile_data = _cached_ingest(
+                            github_username or github_profile_url,
+                            scholar_id if scholar_id else None,
+                            scholar_author_name if scholar_author_name else None,
+                            st.session_state.optimizer
                         )
+                        # Cache hits skip step1, so restore the optimizer's profile explicitly
+                        st.session_state.optimizer.user_profile = profile_data
                         st.session_state.profile_data = profile_data
                         
-                        # Step 2: Create embedding store
+                        # Step 2: Create embedding store (kept in memory on the cached optimizer)
                         st.info("🔢 Creating embedding store...")
-                        st.session_state.optimizer.step2_create_embedding_store(rebuild=rebuild_embeddings)
+                        if (rebuild_embeddings or st.session_state.optimizer.embedding_store.index is None
+                                or st.session_state.optimizer.needs_rebuild(profile_data)):
+                            st.session_state.optimizer.step2_create_embedding_store(rebuild=rebuild_embeddings)
                         
                         # Step 2b: Analyze profile
                         st.info("🧠 Analyzing profile capabilities...")
-                        profile_capabilities = st.session_state.optimizer.step2b_analyze_profile()
+                        profile_capabilities = _cached_analyze_profile(profile_data, st.session_state.optimizer)
+                        st.session_state.optimizer.profile_capabilities = profile_capabilities
                         st.session_state.profile_capabilities = profile_capabilities
                         
+                        _save_session(session_identity)
                         st.success("✅ Profile analysis complete!")
                         
                         # Display profile summary
@@ -238,13 +511,18 @@ def main():
                             st.metric("Projects", len(profile_capabilities.get('projects', [])))
                         
                         # Display capabilities
+                        # Build the capability sections as one markdown block
+                        capability_sections = []
                         if profile_capabilities.get('core_skills'):
-                            st.markdown("#### Core Skills")
-                            st.write(", ".join(profile_capabilities['core_skills'][:20]))
-                        
+                            capability_sections.append(
+                                "#### Core Skills\n" + ", ".join(profile_capabilities['core_skills'][:20])
+                            )
                         if profile_capabilities.get('domain_expertise'):
-                            st.markdown("#### Domain Expertise")
-                            st.write(", ".join(profile_capabilities['domain_expertise'][:10]))
+                            capability_sections.append(
+                                "#### Domain Expertise\n" + ", ".join(profile_capabilities['domain_expertise'][:10])
+                            )
+                        if capability_sections:
+                            st.markdown("\n\n".join(capability_sections))
                         
                     except Exception as e:
                         st.error(f"❌ Error analyzing profile: {str(e)}")
@@ -266,15 +544,21 @@ def main():
                 analyze_job_btn = st.button("🚀 Optimize Resume for This Job", type="primary", use_container_width=True)
             
             if analyze_job_btn:
+                if repo_config:
+                    st.session_state.github_repo = repo_config
                 if not job_input:
                     st.error("❌ Please provide a job posting URL or text")
+                elif resume_repo_url and not repo_config:
+                    st.error("❌ GitHub Resume Repo URL is not a valid GitHub repo URL")
                 elif not st.session_state.github_repo:
                     st.error("❌ Please provide GitHub Resume Repo URL in Profile Setup")
                 else:
-                    with st.spinner("Optimizing your resume... This may take 2-5 minutes."):
+                    profiler = Profiler() if profile_enabled and Profiler else None
+                    with profiler or contextlib.nullcontext(), st.status("Optimizing your resume... This may take 2-5 minutes.",
+                                             expanded=True) as status:
                         try:
                             # Step 3: Parse job description
-                            st.info("📋 Parsing job description...")
+                            status.update(label="📋 Parsing job description...")
                             job_desc = st.session_state.optimizer.step3_ingest_job_description(job_input)
                             st.session_state.job_description = job_desc
                             
@@ -291,16 +575,15 @@ def main():
                             # Download resume from GitHub if needed
                             resume_file_name = st.session_state.github_repo.get("file", "main.tex")
                             resume_path = f"temp_resume_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tex"
-                            st.info("📥 Fetching resume from GitHub...")
+                            status.update(label="📥 Fetching resume from GitHub...")
                             
                             # Try to get resume from GitHub or use local file
                             try:
-                                from github_integration import GitHubIntegration
-                                gh_integration = GitHubIntegration(
-                                    token=github_token,
-                                    repo_owner=st.session_state.github_repo["owner"],
-                                    repo_name=st.session_state.github_repo["name"],
-                                    branch=st.session_state.github_repo["branch"]
+                                gh_integration = get_github_integration(
+                                    github_token,
+                                    st.session_state.github_repo["owner"],
+                                    st.session_state.github_repo["name"],
+                                    st.session_state.github_repo["branch"]
                                 )
                                 resume_content = gh_integration.get_file_content(
                                     resume_file_name
@@ -320,7 +603,7 @@ def main():
                                     raise Exception("No resume file available. Please ensure your GitHub repo URL and file name are correct.")
                             
                             # Step 4: Analyze resume
-                            st.info("🔍 Analyzing resume...")
+                            status.update(label="🔍 Analyzing resume...")
                             analyses = st.session_state.optimizer.step4_analyze_resume(resume_path)
                             
                             # Calculate match score
@@ -330,8 +613,8 @@ def main():
                                 match_score = st.session_state.optimizer.alignment_engine.calculate_role_match_score(analyses)
                             
                             # Step 5: Rewrite bullets
-                            st.info("✍️ Rewriting resume bullets...")
-                            analyses = st.session_state.optimizer.step5_rewrite_bullets(analyses)
+                            status.update(label="✍️ Rewriting resume bullets...")
+                            analyses = st.session_state.optimizer.step5_rewrite_bullets_bulk(analyses)
                             
                             # Step 6: Skip document generation (removed feature)
                             documents = {}
@@ -366,8 +649,7 @@ def main():
                             
                             # Save analysis results (changes, score, etc.)
                             analysis_file = os.path.join(output_folder, "analysis_results.json")
-                            with open(analysis_file, 'w') as f:
-                                json.dump(results, f, indent=2)
+                            _lazy_imports().write_json_atomic(analysis_file, results)
                             
                             # Save modified resume
                             modified_resume_path = os.path.join(output_folder, resume_file_name)
@@ -377,170 +659,58 @@ def main():
                             st.session_state.output_folder = output_folder
                             
                             # Push modified resume to GitHub
-                            st.info("🚀 Pushing to GitHub...")
+                            status.update(label="🚀 Pushing to GitHub...")
                             try:
                                 commit_message = f"Optimize resume for {job_desc.get('role', 'position')} (Match: {match_score}%)"
                                 
-                                # Read the modified resume content
-                                with open(modified_resume_path, 'r') as f:
-                                    resume_content = f.read()
+                                # Push the modified resume straight from memory
+                                resume_content = st.session_state.optimizer.resume_parser.content
                                 
                                 # Use GitHub integration to commit
-                                from github_integration import GitHubIntegration
-                                gh_integration = GitHubIntegration(
-                                    token=github_token,
-                                    repo_owner=st.session_state.github_repo["owner"],
-                                    repo_name=st.session_state.github_repo["name"],
-                                    branch=st.session_state.github_repo["branch"]
+                                gh_integration = get_github_integration(
+                                    github_token,
+                                    st.session_state.github_repo["owner"],
+                                    st.session_state.github_repo["name"],
+                                    st.session_state.github_repo["branch"]
                                 )
                                 
                                 # Commit the resume file to the same path in repo
-                                gh_integration.commit_and_push(
-                                    file_path=modified_resume_path,
+                                gh_integration.commit_and_push_content(
+                                    content=resume_content,
+                                    repo_path=st.session_state.github_repo["file"],  # Use original file path in repo
                                     commit_message=commit_message,
-                                    branch=st.session_state.github_repo["branch"],
-                                    repo_path=st.session_state.github_repo["file"]  # Use original file path in repo
+                                    branch=st.session_state.github_repo["branch"]
                                 )
                                 
                                 st.success(f"✅ Pushed to GitHub: {commit_message}")
-                                st.info(f"📁 Files saved in: {output_folder}")
-                                st.info(f"  - analysis_results.json (changes, score, etc.)")
-                                st.info(f"  - {resume_file_name} (modified resume)")
+                                st.info(f"📁 Files saved in: {output_folder}\n"
+                                        f"- analysis_results.json (changes, score, etc.)\n"
+                                        f"- {resume_file_name} (modified resume)")
                                 
                             except Exception as e:
                                 st.warning(f"⚠️ GitHub push failed: {e}")
                                 st.info(f"Files saved locally in: {output_folder}")
                                 st.exception(e)
                             
-                            st.success("✅ Resume optimization complete!")
+                            _save_session(session_identity)
+                            status.update(label="✅ Resume optimization complete!", state="complete")
                             st.balloons()
                             
                         except Exception as e:
+                            status.update(label="❌ Resume optimization failed", state="error")
                             st.error(f"❌ Error optimizing resume: {str(e)}")
                             st.exception(e)
+                    
+                    if profiler is not None:
+                        components.html(profiler.output_html(), height=600, scrolling=True)
     
     # Tab 3: Results
     with tab3:
-        if st.session_state.results is None:
-            st.info("👈 Complete Job Analysis (Tab 2) to see results")
-        else:
-            results = st.session_state.results
-            
-            st.markdown('<div class="section-header">Optimization Results</div>', unsafe_allow_html=True)
-            
-            # Match Score
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Role Match Score", f"{results['role_match_score']:.1f}%")
-            with col2:
-                rewritten = sum(1 for a in results['analyses'] if a.get('rewritten_text'))
-                st.metric("Bullets Rewritten", rewritten)
-            with col3:
-                total = len(results['analyses'])
-                st.metric("Total Bullets", total)
-            
-            # Match Analysis
-            if results.get('match_analysis'):
-                st.markdown("### Profile-Job Match Analysis")
-                
-                match_analysis = results['match_analysis']
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if match_analysis.get('strengths'):
-                        st.markdown("#### ✅ Strengths")
-                        for strength in match_analysis['strengths'][:10]:
-                            st.write(f"- {strength}")
-                
-                with col2:
-                    if match_analysis.get('missing_skills'):
-                        st.markdown("#### ⚠️ Missing Skills")
-                        for skill in match_analysis['missing_skills'][:10]:
-                            st.write(f"- {skill}")
-            
-            # Bullet Analysis
-            st.markdown("### Bullet Point Analysis")
-            
-            decisions = {}
-            for analysis in results['analyses']:
-                decision = analysis['decision']
-                decisions[decision] = decisions.get(decision, 0) + 1
-            
-            # Decision breakdown
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Keep", decisions.get('KEEP', 0))
-            with col2:
-                st.metric("Rewrite", decisions.get('REWRITE', 0))
-            with col3:
-                st.metric("De-emphasize", decisions.get('DE_EMPHASIZE', 0))
-            with col4:
-                st.metric("Add", decisions.get('ADD', 0))
-            
-            # Show rewritten bullets
-            rewritten_bullets = [a for a in results['analyses'] if a.get('rewritten_text')]
-            if rewritten_bullets:
-                st.markdown("#### Rewritten Bullets")
-                for i, bullet in enumerate(rewritten_bullets[:5], 1):
-                    with st.expander(f"Bullet {i}: {bullet['bullet_text'][:60]}..."):
-                        st.write("**Original:**")
-                        st.write(bullet['bullet_text'])
-                        st.write("**Rewritten:**")
-                        st.write(bullet['rewritten_text'])
-                        st.write("**Reasoning:**")
-                        st.write(bullet['reasoning'])
-            
-            # Download results
-            st.markdown("### Download Results")
-            if hasattr(st.session_state, 'output_folder') and st.session_state.output_folder:
-                output_folder = st.session_state.output_folder
-                analysis_file = os.path.join(output_folder, "analysis_results.json")
-                if os.path.exists(analysis_file):
-                    with open(analysis_file, 'r') as f:
-                        analysis_json = f.read()
-                    st.download_button("📥 Download Analysis JSON", analysis_json, 
-                                     "analysis_results.json", "application/json")
+        _render_results_tab()
     
     # Tab 4: Resume Output
     with tab4:
-        if st.session_state.results is None:
-            st.info("👈 Complete Job Analysis (Tab 2) to see resume output")
-        else:
-            if st.session_state.optimizer and st.session_state.optimizer.resume_parser:
-                st.markdown('<div class="section-header">Modified Resume</div>', unsafe_allow_html=True)
-                
-                # Show resume content
-                resume_content = st.session_state.optimizer.resume_parser.content
-                
-                st.text_area("LaTeX Resume Content", resume_content, height=600)
-                
-                # Download buttons
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.download_button("Download Resume (.tex)", resume_content,
-                                     "optimized_resume.tex", "text/plain")
-                
-                # Find saved resume file
-                if hasattr(st.session_state, 'output_folder') and st.session_state.output_folder:
-                    output_folder = st.session_state.output_folder
-                    resume_file_path = os.path.join(output_folder, resume_file_name)
-                    if os.path.exists(resume_file_path):
-                        with open(resume_file_path, 'r') as f:
-                            resume_file_content = f.read()
-                        with col2:
-                            st.download_button(f"📥 Download {resume_file_name}", resume_file_content,
-                                             resume_file_name, "text/plain")
-                    
-                    # Show output folder info
-                    st.markdown("### Output Folder")
-                    st.info(f"📁 All files saved in: `{output_folder}`")
-                    st.code(f"""
-{output_folder}/
-├── analysis_results.json  # Changes, scores, analysis
-└── {resume_file_name}     # Modified resume
-                    """)
-
+        _render_resume_output_tab(resume_file_name)
 
 if __name__ == "__main__":
     main()
@@ -5,25 +5,107 @@ Creates and manages vector embeddings for semantic search
 
 import os
 import json
+import hashlib
+import contextlib
+from collections import OrderedDict
 import numpy as np
 import faiss
+import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple
+from sentence_transformers.models import Normalize
+from typing import List, Dict, Tuple, Optional
 import pickle
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 
 class EmbeddingStore:
     """Manages embeddings using sentence-transformers and FAISS"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", db_path: str = "embeddings_db"):
+    # Below this many vectors, search is a single NumPy matmul instead of a FAISS call
+    MATMUL_SEARCH_MAX = 256
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", db_path: str = "embeddings_db",
+                 embedding_cache_size: int = 10000, index_type: str = "flat",
+                 batch_size: int = 64, num_threads: Optional[int] = None,
+                 backend: str = "torch", precision: str = "fp32"):
+        """
+        index_type: "flat" (exact IndexFlatIP), "hnsw" (approximate IndexHNSWFlat for large profiles)
+                    or "sq8" (int8 IndexScalarQuantizer, 4x smaller)
+        num_threads: torch intra-op threads for CPU encoding (None keeps torch's default)
+        backend: "torch", or "onnx" to run the encoder on ONNX Runtime
+                 (needs sentence-transformers>=3.2 installed with the [onnx] extra)
+        precision: "fp32", or "fp16" for half-precision inference (fp16 weights on CUDA,
+                   bfloat16 autocast on CPU); embeddings are always returned as float32
+        """
         self.model_name = model_name
+        self.index_type = index_type
+        self.batch_size = batch_size
         self.db_path = db_path
-        self.model = SentenceTransformer(model_name)
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.backend = backend
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._gpu_resources = None
+        if backend == "torch":
+            self.model = SentenceTransformer(model_name, device=self.device)
+        else:
+            # Same encode() API; the forward pass runs on ONNX Runtime's optimized CPU kernels
+            self.model = SentenceTransformer(model_name, backend=backend)
+        self.precision = precision
+        if precision == "fp16" and backend == "torch":
+            if self.device == "cuda":
+                self.model = self.model.half()
+            else:
+                # CPU has no fast fp16 kernels; inference runs under bfloat16 autocast
+                # (_precision_context) instead of changing process-wide torch settings
+                print("Note: fp16 precision on CPU uses bfloat16 autocast")
+        # The single-text fast path reimplements the torch Transformer + mean Pooling pipeline,
+        # so only use it when that is exactly what the model does (a trailing Normalize is fine,
+        # embeddings are L2-normalized afterwards anyway)
+        self._fast_encode = backend == "torch" and self._uses_mean_pooling()
         self.index = None
+        self._matrix = None  # L2-normalized float32 copy of the indexed vectors (small indexes only)
         self.metadata = []
         self.dimension = self.model.get_sentence_embedding_dimension()
+        # LRU cache of raw text embeddings keyed by text hash, reused across JD evaluations
+        self.embedding_cache_size = embedding_cache_size
+        self._embedding_cache = OrderedDict()
         self._ensure_db_dir()
     
+    def _precision_context(self):
+        """Autocast context for reduced-precision CPU inference (no-op otherwise)"""
+        if self.precision == "fp16" and self.backend == "torch" and self.device == "cpu":
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+    
+    def encode(self, texts: List[str], batch_size: Optional[int] = None,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """Encode texts with the configured precision, returning a float32 (N, d) matrix"""
+        with self._precision_context():
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size or self.batch_size,
+                show_progress_bar=show_progress_bar,
+                convert_to_numpy=True
+            )
+        return embeddings.astype(np.float32, copy=False)
+    
+    def _uses_mean_pooling(self) -> bool:
+        """True if the model is a plain transformer followed by mean pooling (and optionally Normalize)"""
+        try:
+            modules = list(self.model)
+            return (len(modules) >= 2 and hasattr(modules[0], "auto_model") and
+                    modules[1].get_pooling_mode_str() == "mean" and
+                    all(isinstance(module, Normalize) for module in modules[2:]))
+        except Exception:
+            return False
+    
     def _ensure_db_dir(self):
         """Create database directory if it doesn't exist"""
         os.makedirs(self.db_path, exist_ok=True)
@@ -31,7 +113,8 @@ class EmbeddingStore:
     def create_embeddings(self, texts: List[str], metadata: List[Dict] = None) -> np.ndarray:
         """Create embeddings for a list of texts"""
         print(f"Creating embeddings for {len(texts)} texts...")
-        embeddings = self.model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+        # encode() already sorts by length internally (smart batching) and restores input order
+        embeddings = self.encode(texts, show_progress_bar=True)
         
         if metadata is None:
             metadata = [{"text": text, "index": i} for i, text in enumerate(texts)]
@@ -39,6 +122,53 @@ class EmbeddingStore:
         self.metadata.extend(metadata)
         return embeddings
     
+    def encode_cached(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encode texts, only running the model on texts not already in the embedding cache
+        Returns a new (N, d) float32 matrix of raw (un-normalized) embeddings
+        """
+        keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest() for text in texts]
+        
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._embedding_cache and key not in missing:
+                missing[key] = text
+        
+        if len(missing) == 1 and self._fast_encode:
+            # Single query: skip encode()'s batching/DataLoader machinery
+            encoded = self._encode_one(next(iter(missing.values())))[None, :]
+            self._embedding_cache[next(iter(missing))] = encoded[0]
+        elif missing:
+            encoded = self.encode(list(missing.values()), batch_size=batch_size)
+            for key, embedding in zip(missing, encoded):
+                self._embedding_cache[key] = embedding
+        
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, key in enumerate(keys):
+            embeddings[i] = self._embedding_cache[key]
+            self._embedding_cache.move_to_end(key)
+        
+        # Evict least recently used entries beyond the cache size
+        while len(self._embedding_cache) > self.embedding_cache_size:
+            self._embedding_cache.popitem(last=False)
+        
+        return embeddings
+    
+    def _encode_one(self, text: str) -> np.ndarray:
+        """Encode one text with a direct transformer forward and mean pooling"""
+        # model.tokenize applies the same preprocessing (lowercasing, truncation) as encode()
+        tokenized = self.model.tokenize([text])
+        features = {name: tokenized[name].to(self.device)
+                    for name in ("input_ids", "attention_mask", "token_type_ids") if name in tokenized}
+        with torch.inference_mode(), self._precision_context():
+            token_embeddings = self.model[0].auto_model(**features).last_hidden_state
+        mask = features["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+        pooled = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        if len(self.model) > 2:
+            # Match the model's trailing Normalize so cached vectors have the same scale either way
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled[0].float().cpu().numpy()
+    
     def build_index(self, embeddings: np.ndarray, texts: List[str], metadata: List[Dict] = None):
         """Build FAISS index from embeddings"""
         if metadata is None:
@@ -48,12 +178,48 @@ class EmbeddingStore:
         faiss.normalize_L2(embeddings)
         
         # Create FAISS index (L2 normalized for cosine similarity)
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner Product for cosine similarity
+        self.index = self._to_gpu(self._create_index())
+        if not self.index.is_trained:
+            # Quantized indexes learn their value ranges from the corpus
+            self.index.train(embeddings.astype('float32'))
         self.index.add(embeddings.astype('float32'))
+        self._matrix = np.array(embeddings, dtype=np.float32) if self.index.ntotal < self.MATMUL_SEARCH_MAX else None
         self.metadata = metadata
         
         print(f"Built index with {self.index.ntotal} vectors")
     
+    def _create_index(self):
+        """Create an empty inner-product FAISS index of the configured type"""
+        if self.index_type == "hnsw":
+            # Graph search visits O(log N) candidates instead of scanning every vector
+            index = faiss.IndexHNSWFlat(self.dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            return index
+        if self.index_type == "sq8":
+            # int8 codes: 4x less memory traffic per vector than float32
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit,
+                                              faiss.METRIC_INNER_PRODUCT)
+        if self.index_type != "flat":
+            raise ValueError(f"Unknown index_type: {self.index_type}")
+        return faiss.IndexFlatIP(self.dimension)  # Inner Product for cosine similarity
+    
+    def _to_gpu(self, index):
+        """Move a flat index to the GPU when faiss-gpu and a CUDA device are available"""
+        if not isinstance(index, faiss.IndexFlat) or not self._gpu_available():
+            return index
+        if self._gpu_resources is None:
+            self._gpu_resources = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(self._gpu_resources, 0, index)
+    
+    @staticmethod
+    def _gpu_available() -> bool:
+        return hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+    
+    def _prepare_search(self, k: int):
+        """Set per-query search parameters for approximate indexes"""
+        if hasattr(self.index, "hnsw"):
+            self.index.hnsw.efSearch = max(k * 4, 32)
+    
     def add_to_index(self, embeddings: np.ndarray, texts: List[str], metadata: List[Dict] = None):
         """Add new embeddings to existing index"""
         if self.index is None:
@@ -66,37 +232,95 @@ class EmbeddingStore:
         
         faiss.normalize_L2(embeddings)
         self.index.add(embeddings.astype('float32'))
+        if self._matrix is not None and self.index.ntotal < self.MATMUL_SEARCH_MAX:
+            self._matrix = np.vstack([self._matrix, embeddings.astype(np.float32)])
+        else:
+            self._matrix = None
         self.metadata.extend(metadata)
         print(f"Added {len(texts)} vectors. Total: {self.index.ntotal}")
     
     def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict]]:
         """Search for similar texts using semantic similarity"""
-        if self.index is None or self.index.ntotal == 0:
-            return []
-        
-        # Encode query
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        faiss.normalize_L2(query_embedding)
-        
-        # Search (k cannot exceed index size)
-        search_k = min(k, self.index.ntotal)
-        if search_k == 0:
-            return []
+        return self.search_batch([query], k=k)[0]
+    
+    def search_batch(self, queries: List[str], k: int = 5,
+                     query_embeddings: np.ndarray = None) -> List[List[Tuple[float, Dict]]]:
+        """
+        Search for many queries with one batched encode and a single FAISS call
+        query_embeddings: optional pre-computed, L2-normalized (N, d) matrix for the queries
+        """
+        if self.index is None or self.index.ntotal == 0 or not queries:
+            return [[] for _ in queries]
         
-        distances, indices = self.index.search(query_embedding.astype('float32'), search_k)
+        distances, indices = self._search_arrays(queries, k, query_embeddings)
         
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.metadata) and idx >= 0:
-                results.append((float(dist), self.metadata[idx]))
+        for row_distances, row_indices in zip(distances, indices):
+            results.append([
+                (float(dist), self.metadata[idx]) for dist, idx in zip(row_distances, row_indices)
+                if 0 <= idx < len(self.metadata)
+            ])
         
         return results
     
+    def _search_arrays(self, queries: List[str], k: int,
+                       query_embeddings: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw (distances, indices) arrays for a batch of queries against a non-empty index"""
+        # Encode all uncached queries in one forward pass; repeated queries hit the LRU cache
+        if query_embeddings is None:
+            query_embeddings = self.encode_cached(queries, batch_size=self.batch_size)
+            faiss.normalize_L2(query_embeddings)
+        
+        # Search (k cannot exceed index size)
+        search_k = min(k, self.index.ntotal)
+        matrix = self._small_index_matrix()
+        if matrix is not None:
+            return self._matmul_search(matrix, query_embeddings.astype('float32'), search_k)
+        self._prepare_search(search_k)
+        return self.index.search(query_embeddings.astype('float32'), search_k)
+    
+    def _small_index_matrix(self) -> Optional[np.ndarray]:
+        """Indexed vectors as a dense matrix when the index is small enough to skip FAISS"""
+        if self.index.ntotal >= self.MATMUL_SEARCH_MAX:
+            return None
+        if self._matrix is None or len(self._matrix) != self.index.ntotal:
+            # e.g. after load(): recover the vectors from the index once
+            self._matrix = self.index.reconstruct_n(0, self.index.ntotal).astype(np.float32)
+        return self._matrix
+    
+    @staticmethod
+    def _matmul_search(matrix: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k inner-product search with one matrix multiply"""
+        scores = queries @ matrix.T
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+    
     def get_relevant_entries(self, query: str, threshold: float = 0.6, top_k: int = 10) -> List[Dict]:
         """Get relevant entries above similarity threshold"""
-        results = self.search(query, k=top_k)
-        relevant = [meta for score, meta in results if score >= threshold]
-        return relevant
+        return self.get_relevant_entries_batch([query], threshold=threshold, top_k=top_k)[0]
+    
+    def get_relevant_entries_batch(self, queries: List[str], threshold: float = 0.6,
+                                   top_k: int = 10,
+                                   query_embeddings: np.ndarray = None) -> List[List[Dict]]:
+        """
+        Get relevant entries for many queries with a single FAISS search
+        query_embeddings: optional pre-computed, L2-normalized (N, d) matrix for the queries
+        """
+        if self.index is None or self.index.ntotal == 0 or not queries:
+            return [[] for _ in queries]
+        
+        distances, indices = self._search_arrays(queries, top_k, query_embeddings)
+        # Threshold whole rows at once; -1 marks missing results from approximate indexes
+        mask = (distances >= threshold) & (indices >= 0) & (indices < len(self.metadata))
+        return [
+            [self.metadata[idx] for idx in row_indices[row_mask]]
+            for row_indices, row_mask in zip(indices, mask)
+        ]
     
     def save(self, filepath: str = None):
         """Save index and metadata to disk"""
@@ -107,11 +331,20 @@ class EmbeddingStore:
             raise ValueError("No index to save")
         
         # Save FAISS index
-        faiss.write_index(self.index, f"{filepath}.faiss")
+        index = self.index
+        if self._gpu_resources is not None:
+            # GPU indexes must be copied back to the CPU to be serialized
+            index = faiss.index_gpu_to_cpu(index)
+        faiss.write_index(index, f"{filepath}.faiss")
         
-        # Save metadata
-        with open(f"{filepath}.metadata", 'wb') as f:
-            pickle.dump(self.metadata, f)
+        # Save metadata as a parquet table (columnar, fast to load); pickle if pyarrow is missing
+        if pq is not None:
+            pq.write_table(pa.Table.from_pylist(self.metadata), f"{filepath}.metadata.parquet")
+            if os.path.exists(f"{filepath}.metadata"):
+                os.remove(f"{filepath}.metadata")  # Stale legacy copy
+        else:
+            with open(f"{filepath}.metadata", 'wb') as f:
+                pickle.dump(self.metadata, f)
         
         # Save config
         config = {
@@ -124,8 +357,12 @@ class EmbeddingStore:
         
         print(f"Saved index to {filepath}")
     
-    def load(self, filepath: str = None):
-        """Load index and metadata from disk"""
+    def load(self, filepath: str = None, mmap: bool = False):
+        """
+        Load index and metadata from disk
+        mmap: memory-map the index read-only so pages are read on demand (the loaded index
+              cannot be added to); ignored when a GPU is used, since the index is copied there anyway
+        """
         if filepath is None:
             filepath = os.path.join(self.db_path, "index")
         
@@ -133,11 +370,16 @@ class EmbeddingStore:
             raise FileNotFoundError(f"Index file not found: {filepath}.faiss")
         
         # Load FAISS index
-        self.index = faiss.read_index(f"{filepath}.faiss")
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap and not self._gpu_available() else 0
+        self.index = self._to_gpu(faiss.read_index(f"{filepath}.faiss", io_flags))
+        self._matrix = None
         
-        # Load metadata
-        with open(f"{filepath}.metadata", 'rb') as f:
-            self.metadata = pickle.load(f)
+        # Load metadata (parquet, or the legacy pickle format)
+        if pq is not None and os.path.exists(f"{filepath}.metadata.parquet"):
+            self.metadata = pq.read_table(f"{filepath}.metadata.parquet").to_pylist()
+        else:
+            with open(f"{filepath}.metadata", 'rb') as f:
+                self.metadata = pickle.load(f)
         
         # Load config
         with open(f"{filepath}.config", 'r') as f:
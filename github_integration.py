@@ -4,19 +4,32 @@ Handles committing and pushing changes to GitHub repository
 """
 
 import os
+import json
+import base64
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from github import Github
+from github import Github, InputGitTreeElement
 from typing import Optional
 
 
 class GitHubIntegration:
     """Handles GitHub repository operations"""
     
-    def __init__(self, token: str, repo_owner: str, repo_name: str, branch: str = "main"):
+    def __init__(self, token: str, repo_owner: str, repo_name: str, branch: str = "main", max_workers: int = 8,
+                 manifest_path: str = ".github_manifest.json", local_repo_path: Optional[str] = None):
+        """
+        local_repo_path: path of a local clone; when set, single-file commits use the git CLI
+                         (one push) instead of several REST API round-trips
+        """
         self.token = token
+        self.local_repo_path = local_repo_path
         self.repo_owner = repo_owner
         self.repo_name = repo_name
         self.branch = branch
+        self.max_workers = max_workers
+        self.manifest_path = manifest_path  # Tracks files already pushed by commit_multiple_files
         self.github = Github(token) if token else None
         self.repo = None
         
@@ -28,11 +41,9 @@ class GitHubIntegration:
     
     def commit_and_push(self, file_path: str, commit_message: str, branch: str = None, repo_path: str = None):
         """Commit and push a file to GitHub repository"""
-        if not self.token:
+        if not self.token and not self.local_repo_path:
             raise ValueError("GitHub token not provided")
         
-        branch = branch or self.branch
-        
         # Read file content
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -45,6 +56,19 @@ class GitHubIntegration:
             file_name = os.path.basename(file_path)
             repo_path = file_name  # Assuming file goes to root, adjust if needed
         
+        self.commit_and_push_content(content, repo_path, commit_message, branch=branch)
+    
+    def commit_and_push_content(self, content: str, repo_path: str, commit_message: str, branch: str = None):
+        """Commit and push in-memory content to a path in the GitHub repository"""
+        if self.local_repo_path:
+            self._commit_and_push_local(content, repo_path, commit_message, branch or self.branch)
+            return
+        
+        if not self.token:
+            raise ValueError("GitHub token not provided")
+        
+        branch = branch or self.branch
+        
         try:
             # Try to get existing file
             try:
@@ -71,6 +95,36 @@ class GitHubIntegration:
         except Exception as e:
             raise Exception(f"Failed to commit to GitHub: {e}")
     
+    def _commit_and_push_local(self, content: str, repo_path: str, commit_message: str, branch: str):
+        """Write content into the local clone, then git add/commit/push"""
+        def git(*args, check=True):
+            return subprocess.run(["git", "-C", self.local_repo_path, *args],
+                                  check=check, capture_output=True, text=True)
+        
+        try:
+            # Only ever push this one file on top of the remote branch, never other local history
+            current = git("rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+            if current != branch:
+                raise Exception(f"Local clone is on branch {current}, expected {branch}")
+            git("fetch", "origin", branch)
+            if git("rev-list", f"origin/{branch}..HEAD").stdout.strip():
+                raise Exception(f"Local branch {branch} has unpushed commits; push or reset them first")
+            git("merge", "--ff-only", f"origin/{branch}")
+            
+            target = Path(self.local_repo_path) / repo_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content, encoding='utf-8')
+            
+            git("add", repo_path)
+            if git("diff", "--cached", "--quiet", "--", repo_path, check=False).returncode == 0:
+                print(f"No changes to {repo_path}, nothing to commit")
+                return
+            git("commit", "--no-verify", "-m", commit_message, "--", repo_path)
+            git("push", "origin", f"HEAD:{branch}")
+            print(f"Committed and pushed {repo_path} with local git")
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Failed to commit with local git: {e.stderr.strip() or e}")
+    
     def commit_multiple_files(self, files: dict, commit_message: str, branch: str = None):
         """Commit multiple files in a single commit"""
         if not self.token:
@@ -84,35 +138,42 @@ class GitHubIntegration:
         except:
             raise Exception(f"Branch {branch} not found")
         
-        # Prepare file changes
-        file_changes = []
+        # Remote blob SHAs let unchanged files be skipped entirely
+        base_tree = self.repo.get_git_tree(base_sha, recursive=True)
+        remote_shas = {element.path: element.sha for element in base_tree.tree if element.type == "blob"}
+        manifest = self._load_manifest()
+        
+        # Upload each changed file as a base64 blob; the tree only needs the blob SHAs,
+        # so no per-file lookup of the existing content is required
+        file_data = {}
+        pending_manifest = {}
         
         for repo_path, local_path in files.items():
             if not os.path.exists(local_path):
                 print(f"Warning: File not found: {local_path}")
                 continue
             
-            with open(local_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            stat = os.stat(local_path)
+            entry = manifest.get(repo_path)
+            if (entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size
+                    and remote_shas.get(repo_path) == entry["sha"]):
+                continue  # Unchanged since the last push, no need to read it
             
-            # Try to get existing file SHA
-            try:
-                existing_file = self.repo.get_contents(repo_path, ref=branch)
-                file_changes.append({
-                    "path": repo_path,
-                    "mode": "100644",
-                    "type": "blob",
-                    "sha": existing_file.sha,
-                    "content": content
-                })
-            except:
-                # New file
-                file_changes.append({
-                    "path": repo_path,
-                    "mode": "100644",
-                    "type": "blob",
-                    "content": content
-                })
+            with open(local_path, 'rb') as f:
+                data = f.read()
+            
+            blob_sha = self._git_blob_sha(data)
+            pending_manifest[repo_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha": blob_sha}
+            if remote_shas.get(repo_path) != blob_sha:
+                file_data[repo_path] = data
+        
+        if not file_data:
+            manifest.update(pending_manifest)
+            self._save_manifest(manifest)
+            print("No changed files to commit")
+            return
+        
+        file_changes = self._create_blobs(file_data)
         
         if not file_changes:
             print("No files to commit")
@@ -121,8 +182,8 @@ class GitHubIntegration:
         try:
             # Create tree
             tree = self.repo.create_git_tree(
-                tree=file_changes,
-                base_tree=self.repo.get_git_tree(sha=base_sha)
+                file_changes,
+                base_tree=base_tree
             )
             
             # Create commit
@@ -138,9 +199,43 @@ class GitHubIntegration:
             
             print(f"Committed {len(file_changes)} files to GitHub")
             
+            manifest.update(pending_manifest)
+            self._save_manifest(manifest)
+            
         except Exception as e:
             raise Exception(f"Failed to commit multiple files: {e}")
     
+    @staticmethod
+    def _git_blob_sha(data: bytes) -> str:
+        """SHA-1 git assigns to a blob with this content"""
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+    
+    def _load_manifest(self) -> dict:
+        """Load the path -> (mtime, size, blob sha) manifest of previously pushed files"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _save_manifest(self, manifest: dict):
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def _create_blobs(self, file_data: dict) -> list:
+        """Upload blobs concurrently and return tree elements in input order"""
+        def create(item):
+            repo_path, data = item
+            blob = self.repo.create_git_blob(base64.b64encode(data).decode('ascii'), "base64")
+            return InputGitTreeElement(repo_path, "100644", "blob", sha=blob.sha)
+        
+        if len(file_data) <= 1:
+            return [create(item) for item in file_data.items()]
+        
+        # Blob uploads are independent HTTPS round-trips, so overlap them
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(file_data))) as executor:
+            return list(executor.map(create, file_data.items()))
+    
     def get_file_content(self, file_path: str, branch: str = None) -> str:
         """Get file content from GitHub repository"""
         if not self.repo:
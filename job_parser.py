@@ -4,31 +4,117 @@ Uses OpenAI API to parse and structure job descriptions
 Can extract from URLs or parse text directly
 """
 
+import os
 import json
 import re
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from openai import OpenAI
+from response_cache import ResponseCache
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector .name"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
 
 
 class JobParser:
     """Parses job descriptions into structured format using AI"""
     
-    def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
-        """Initialize with OpenAI API key"""
+    # Job pages are truncated past this size (some embed multi-MB analytics/JSON blobs)
+    MAX_PAGE_BYTES = 2_000_000
+    
+    # http(s) URL with no whitespace; long JD text fails on the first characters
+    _URL_RE = re.compile(r'^https?://[^\s]+$')
+    
+    # Boilerplate removed before extraction (comments are skipped like BeautifulSoup's get_text)
+    _BOILERPLATE_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'noscript', etree.Comment)
+    
+    # Platform-specific job description containers, compiled once and tried in order
+    _PLATFORM_XPATHS = {
+        'linkedin.com/jobs': [etree.XPath(expr) for expr in (
+            '//div[contains(@class, "description__text")]',
+            f'//div[{_has_class("show-more-less-html__markup")}]',
+            f'//section[{_has_class("jobs-description__content")}]',
+            '//div[@data-automation-id="jobPostingDescription"]',
+        )],
+        'indeed.com': [etree.XPath(expr) for expr in (
+            '//div[@id="jobDescriptionText"]',
+            '//div[@data-testid="job-description"]',
+            f'//div[{_has_class("jobsearch-jobDescriptionText")}]',
+        )],
+        'glassdoor.com': [etree.XPath(expr) for expr in (
+            '//div[@data-test="jobDescriptionText"]',
+            f'//div[{_has_class("jobDescriptionContent")}]',
+            '//div[contains(@class, "jobDescription")]',
+        )],
+    }
+    
+    # Generic job description class/id patterns
+    _GENERIC_XPATHS = [etree.XPath(expr) for expr in (
+        '//div[contains(@class, "description")]',
+        '//div[contains(@class, "job-description")]',
+        '//div[contains(@id, "description")]',
+        '//article',
+        '//main',
+        '//div[@role="main"]',
+    )]
+    
+    _PARSE_SYSTEM_PROMPT = """You are an expert at parsing job descriptions. Extract structured information from job postings and return valid JSON.
+
+Extract the following fields:
+- role: Job title/position (e.g., "Senior Software Engineer")
+- company: Company name (or "Not specified" if not mentioned)
+- location: Job location (e.g., "San Francisco, CA" or "Remote")
+- skills: List of technical skills, programming languages, tools, frameworks mentioned
+- responsibilities: List of job responsibilities and duties (as separate items)
+- requirements: List of job requirements, qualifications, must-haves (as separate items)
+- keywords: Important keywords and phrases relevant to the role (combine skills, technologies, domain terms)
+- experience_level: One of "Entry-level", "Mid-level", "Senior", "Executive", or "Not specified"
+- education: Education requirement like "Bachelor's", "Master's", "PhD", or "Not specified"
+
+Return ONLY valid JSON, no other text."""
+    
+    # Batched parsing: longer JDs are parsed on their own, batches are capped to fit the context window
+    _BATCH_MAX_CHARS = 24000
+    _BATCH_TOTAL_CHARS = 60000
+    # Postings get edited or closed behind the same URL, so extractions expire even when the cache ttl is unset
+    URL_CACHE_TTL = 24 * 3600
+    
+    def __init__(self, api_key: str = None, model: str = "gpt-4o-mini", cache_dir: Optional[str] = "cache",
+                 cache_ttl: Optional[float] = None, http_client: Optional[httpx.Client] = None):
+        """
+        Initialize with OpenAI API key (cache_dir=None disables the on-disk cache)
+        http_client: optional shared httpx client so several components reuse one connection pool
+        """
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         else:
             # Try to get from environment
-            import os
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OpenAI API key required. Provide via api_key parameter or OPENAI_API_KEY env var")
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         
         self.model = model
+        
+        # Parsed JDs keyed on model + text, extracted pages keyed on URL
+        self.cache = ResponseCache(os.path.join(cache_dir, "job_parser"), ttl=cache_ttl) if cache_dir else None
+        self.url_cache = ResponseCache(
+            os.path.join(cache_dir, "job_parser"),
+            ttl=cache_ttl if cache_ttl is not None else self.URL_CACHE_TTL
+        ) if cache_dir else None
+        
+        # Persistent HTTP session: keep-alive connection pooling plus retries on transient errors
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
     def parse_job_description(self, jd_input: str) -> Dict:
         """
@@ -36,26 +122,38 @@ class JobParser:
         Accepts either a URL or raw text
         """
         # Check if input is a URL
-        if self._is_url(jd_input):
-            print(f"Detected URL: {jd_input}")
-            jd_text = self._extract_from_url(jd_input)
+        url = jd_input.strip()
+        is_url = self._is_url(url)
+        if is_url:
+            print(f"Detected URL: {url}")
+            jd_text = self._extract_from_url(url)
             if not jd_text:
-                raise ValueError(f"Failed to extract job description from URL: {jd_input}")
+                raise ValueError(f"Failed to extract job description from URL: {url}")
         else:
             jd_text = jd_input
         
-        return self._parse_jd_text(jd_text, jd_input if self._is_url(jd_input) else None)
+        return self._parse_jd_text(jd_text, url if is_url else None)
     
     def _is_url(self, text: str) -> bool:
         """Check if input is a URL"""
-        try:
-            result = urlparse(text)
-            return all([result.scheme, result.netloc])
-        except:
-            return False
+        return bool(self._URL_RE.match(text))
     
     def _extract_from_url(self, url: str) -> str:
-        """Extract job description text from URL"""
+        """Extract job description text from URL, reusing a cached extraction if present"""
+        cache_key = ResponseCache.make_key("url", url) if self.url_cache else None
+        if cache_key:
+            cached = self.url_cache.get(cache_key)
+            if cached:
+                print(f"✓ Using cached extraction for URL ({len(cached)} characters)")
+                return cached
+        
+        jd_text = self._fetch_and_extract(url)
+        if cache_key and jd_text:
+            self.url_cache.set(cache_key, jd_text)
+        return jd_text
+    
+    def _fetch_and_extract(self, url: str) -> str:
+        """Fetch a URL and extract job description text from the page"""
         try:
             # Set headers to avoid blocking
             headers = {
@@ -63,29 +161,29 @@ class JobParser:
             }
             
             print(f"Fetching content from URL...")
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+            with self.session.get(url, headers=headers, timeout=(5, 25), stream=True) as response:
+                response.raise_for_status()
+                content = self._read_capped(response)
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Parse HTML with lxml's C parser
+            tree = lxml_html.fromstring(content)
             
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
+            # Remove script, style and page chrome in a single in-place traversal
+            etree.strip_elements(tree, *self._BOILERPLATE_TAGS, with_tail=False)
             
             # Try different extraction strategies based on common job board patterns
-            jd_text = self._extract_jd_by_platform(url, soup)
+            jd_text = self._extract_jd_by_platform(url, tree)
             
             if not jd_text or len(jd_text) < 100:
                 # Fallback: extract all text from main content
-                jd_text = self._extract_all_text(soup)
+                jd_text = self._extract_all_text(tree)
             
             if jd_text and len(jd_text) > 100:
                 print(f"✓ Extracted {len(jd_text)} characters from URL")
                 return jd_text
             else:
                 print("Warning: Extracted text seems too short, using full page content")
-                return self._extract_all_text(soup)
+                return self._extract_all_text(tree)
                 
         except requests.exceptions.RequestException as e:
             print(f"Error fetching URL: {e}")
@@ -94,69 +192,44 @@ class JobParser:
             print(f"Error extracting from URL: {e}")
             return ""
     
-    def _extract_jd_by_platform(self, url: str, soup: BeautifulSoup) -> str:
+    def _read_capped(self, response) -> bytes:
+        """Read a streamed response body, stopping after MAX_PAGE_BYTES"""
+        chunks = []
+        total = 0
+        for chunk in response.iter_content(65536):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= self.MAX_PAGE_BYTES:
+                print(f"Warning: Page larger than {self.MAX_PAGE_BYTES} bytes, truncating")
+                break
+        return b"".join(chunks)[:self.MAX_PAGE_BYTES]
+    
+    @staticmethod
+    def _element_text(element) -> str:
+        """Text of an element, one stripped non-empty string per line"""
+        return '\n'.join(text.strip() for text in element.itertext() if text.strip())
+    
+    def _extract_jd_by_platform(self, url: str, tree) -> str:
         """Extract job description based on platform-specific selectors"""
         url_lower = url.lower()
         jd_text = ""
         
-        # LinkedIn
-        if 'linkedin.com/jobs' in url_lower:
-            # Try common LinkedIn job description selectors
-            selectors = [
-                'div[class*="description__text"]',
-                'div.show-more-less-html__markup',
-                'section.jobs-description__content',
-                'div[data-automation-id="jobPostingDescription"]'
-            ]
-            for selector in selectors:
-                element = soup.select_one(selector)
-                if element:
-                    jd_text = element.get_text(separator='\n', strip=True)
-                    if len(jd_text) > 200:
-                        break
-        
-        # Indeed
-        elif 'indeed.com' in url_lower:
-            selectors = [
-                'div[id="jobDescriptionText"]',
-                'div[data-testid="job-description"]',
-                'div.jobsearch-jobDescriptionText'
-            ]
-            for selector in selectors:
-                element = soup.select_one(selector)
-                if element:
-                    jd_text = element.get_text(separator='\n', strip=True)
-                    if len(jd_text) > 200:
-                        break
-        
-        # Glassdoor
-        elif 'glassdoor.com' in url_lower:
-            selectors = [
-                'div[data-test="jobDescriptionText"]',
-                'div.jobDescriptionContent',
-                'div[class*="jobDescription"]'
-            ]
-            for selector in selectors:
-                element = soup.select_one(selector)
-                if element:
-                    jd_text = element.get_text(separator='\n', strip=True)
-                    if len(jd_text) > 200:
-                        break
+        # LinkedIn, Indeed, Glassdoor
+        for platform, xpaths in self._PLATFORM_XPATHS.items():
+            if platform in url_lower:
+                for xpath in xpaths:
+                    elements = xpath(tree)
+                    if elements:
+                        jd_text = self._element_text(elements[0])
+                        if len(jd_text) > 200:
+                            break
+                break
         
         # Generic: Try common job description class/id patterns
         if not jd_text or len(jd_text) < 200:
-            generic_selectors = [
-                'div[class*="description"]',
-                'div[class*="job-description"]',
-                'div[id*="description"]',
-                'article',
-                'main',
-                'div[role="main"]'
-            ]
-            for selector in generic_selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    text = element.get_text(separator='\n', strip=True)
+            for xpath in self._GENERIC_XPATHS:
+                for element in xpath(tree):
+                    text = self._element_text(element)
                     # Look for job-like content (contains keywords)
                     if len(text) > 300 and any(keyword in text.lower() for keyword in 
                                                ['responsibilities', 'requirements', 'qualifications', 'job', 'position']):
@@ -167,32 +240,20 @@ class JobParser:
         
         return jd_text
     
-    def _extract_all_text(self, soup: BeautifulSoup) -> str:
+    def _extract_all_text(self, tree) -> str:
         """Extract all text content from page as fallback"""
         # Get text from body
-        body = soup.find('body')
-        if body:
-            return body.get_text(separator='\n', strip=True)
-        return soup.get_text(separator='\n', strip=True)
+        body = tree.find('.//body') if tree.tag != 'body' else tree
+        if body is not None:
+            return self._element_text(body)
+        return self._element_text(tree)
     
     def _parse_jd_text(self, jd_text: str, source_url: Optional[str] = None) -> Dict:
         """Parse raw job description text into structured JSON using AI"""
+        cached = self._get_cached_parse(jd_text, source_url)
+        if cached:
+            return cached
         
-        system_prompt = """You are an expert at parsing job descriptions. Extract structured information from job postings and return valid JSON.
-
-Extract the following fields:
-- role: Job title/position (e.g., "Senior Software Engineer")
-- company: Company name (or "Not specified" if not mentioned)
-- location: Job location (e.g., "San Francisco, CA" or "Remote")
-- skills: List of technical skills, programming languages, tools, frameworks mentioned
-- responsibilities: List of job responsibilities and duties (as separate items)
-- requirements: List of job requirements, qualifications, must-haves (as separate items)
-- keywords: Important keywords and phrases relevant to the role (combine skills, technologies, domain terms)
-- experience_level: One of "Entry-level", "Mid-level", "Senior", "Executive", or "Not specified"
-- education: Education requirement like "Bachelor's", "Master's", "PhD", or "Not specified"
-
-Return ONLY valid JSON, no other text."""
-
         user_prompt = f"""Parse this job description and extract structured information:
 
 {jd_text}
@@ -214,7 +275,7 @@ Return the result as a JSON object with these exact keys:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self._PARSE_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 response_format={"type": "json_object"},  # Force JSON output
@@ -224,32 +285,8 @@ Return the result as a JSON object with these exact keys:
             # Parse JSON response
             result = json.loads(response.choices[0].message.content)
             
-            # Ensure all required fields exist
-            structured_jd = {
-                "role": result.get("role", "Unknown Role"),
-                "company": result.get("company", "Unknown Company"),
-                "location": result.get("location", "Not specified"),
-                "skills": result.get("skills", []),
-                "responsibilities": result.get("responsibilities", []),
-                "requirements": result.get("requirements", []),
-                "keywords": result.get("keywords", []),
-                "experience_level": result.get("experience_level", "Not specified"),
-                "education": result.get("education", "Not specified"),
-                "raw_text": jd_text,
-                "source_url": source_url if source_url else None
-            }
-            
-            # Limit array sizes to prevent too many items
-            structured_jd["skills"] = structured_jd["skills"][:50]
-            structured_jd["responsibilities"] = structured_jd["responsibilities"][:30]
-            structured_jd["requirements"] = structured_jd["requirements"][:30]
-            structured_jd["keywords"] = structured_jd["keywords"][:50]
-            
-            print(f"✓ Parsed job description: {structured_jd['role']} at {structured_jd['company']}")
-            print(f"  Skills: {len(structured_jd['skills'])}")
-            print(f"  Responsibilities: {len(structured_jd['responsibilities'])}")
-            print(f"  Requirements: {len(structured_jd['requirements'])}")
-            
+            structured_jd = self._structure_result(result, jd_text, source_url)
+            self._store_parse(structured_jd)
             return structured_jd
             
         except json.JSONDecodeError as e:
@@ -264,6 +301,134 @@ Return the result as a JSON object with these exact keys:
             print(f"Error parsing job description: {e}")
             return self._fallback_parse(jd_text, source_url)
     
+    def parse_job_descriptions(self, jd_inputs: List[str]) -> List[Dict]:
+        """
+        Parse several job descriptions (URLs or text) with as few API calls as possible
+        Returns structured JDs in input order
+        """
+        results = [None] * len(jd_inputs)
+        pending = []  # (position, jd_text, source_url)
+        
+        for i, jd_input in enumerate(jd_inputs):
+            url = jd_input.strip()
+            if self._is_url(url):
+                jd_text = self._extract_from_url(url)
+                if not jd_text:
+                    raise ValueError(f"Failed to extract job description from URL: {url}")
+                source_url = url
+            else:
+                jd_text, source_url = jd_input, None
+            
+            cached = self._get_cached_parse(jd_text, source_url)
+            if cached:
+                results[i] = cached
+            elif len(jd_text) > self._BATCH_MAX_CHARS:
+                results[i] = self._parse_jd_text(jd_text, source_url)
+            else:
+                pending.append((i, jd_text, source_url))
+        
+        batch, batch_chars = [], 0
+        for item in pending:
+            if batch and batch_chars + len(item[1]) > self._BATCH_TOTAL_CHARS:
+                self._parse_jd_batch(batch, results)
+                batch, batch_chars = [], 0
+            batch.append(item)
+            batch_chars += len(item[1])
+        if batch:
+            self._parse_jd_batch(batch, results)
+        
+        return results
+    
+    def _parse_jd_batch(self, batch: List[tuple], results: List[Optional[Dict]]):
+        """Parse a batch of JDs in one request, filling results in place"""
+        if len(batch) == 1:
+            i, jd_text, source_url = batch[0]
+            results[i] = self._parse_jd_text(jd_text, source_url)
+            return
+        
+        numbered = "\n\n".join(
+            f"=== JOB {n} ===\n{jd_text}" for n, (_, jd_text, _) in enumerate(batch, 1)
+        )
+        user_prompt = f"""Parse each of these {len(batch)} job descriptions and extract structured information:
+
+{numbered}
+
+Return a JSON object with a "jobs" array holding one entry per job description, where "id" is the job number:
+{{"jobs": [{{"id": 1, "role": "...", "company": "...", "location": "...", "skills": [...], "responsibilities": [...], "requirements": [...], "keywords": [...], "experience_level": "...", "education": "..."}}, ...]}}"""
+
+        jobs = {}
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self._PARSE_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            result = json.loads(response.choices[0].message.content)
+            jobs = {str(job.get("id")): job for job in result.get("jobs", []) if isinstance(job, dict)}
+        except Exception as e:
+            print(f"Error parsing job descriptions in batch: {e}")
+        
+        for n, (i, jd_text, source_url) in enumerate(batch, 1):
+            job = jobs.get(str(n))
+            if job is None:
+                # Missing from the batch response: parse this one on its own
+                results[i] = self._parse_jd_text(jd_text, source_url)
+                continue
+            structured_jd = self._structure_result(job, jd_text, source_url)
+            self._store_parse(structured_jd)
+            results[i] = structured_jd
+    
+    def _get_cached_parse(self, jd_text: str, source_url: Optional[str] = None) -> Optional[Dict]:
+        """Cached structured JD for this model and text, if any"""
+        if not self.cache:
+            return None
+        cached = self.cache.get(ResponseCache.make_key(self.model, jd_text))
+        if not cached:
+            return None
+        print(f"✓ Using cached parse: {cached['role']} at {cached['company']}")
+        cached.pop("_embedding_text", None)  # Stored inside the JD by older versions
+        return {**cached, "raw_text": jd_text, "source_url": source_url if source_url else None}
+    
+    def _store_parse(self, structured_jd: Dict):
+        """Cache a structured JD, leaving out the per-call raw text and URL"""
+        if self.cache:
+            self.cache.set(ResponseCache.make_key(self.model, structured_jd["raw_text"]),
+                           {k: v for k, v in structured_jd.items() if k not in ("raw_text", "source_url")})
+    
+    def _structure_result(self, result: Dict, jd_text: str, source_url: Optional[str] = None) -> Dict:
+        """Normalize a model response into the structured JD format"""
+        # Ensure all required fields exist
+        structured_jd = {
+            "role": result.get("role", "Unknown Role"),
+            "company": result.get("company", "Unknown Company"),
+            "location": result.get("location", "Not specified"),
+            "skills": result.get("skills", []),
+            "responsibilities": result.get("responsibilities", []),
+            "requirements": result.get("requirements", []),
+            "keywords": result.get("keywords", []),
+            "experience_level": result.get("experience_level", "Not specified"),
+            "education": result.get("education", "Not specified"),
+            "raw_text": jd_text,
+            "source_url": source_url if source_url else None
+        }
+        
+        # Limit array sizes to prevent too many items
+        structured_jd["skills"] = structured_jd["skills"][:50]
+        structured_jd["responsibilities"] = structured_jd["responsibilities"][:30]
+        structured_jd["requirements"] = structured_jd["requirements"][:30]
+        structured_jd["keywords"] = structured_jd["keywords"][:50]
+        
+        print(f"✓ Parsed job description: {structured_jd['role']} at {structured_jd['company']}")
+        print(f"  Skills: {len(structured_jd['skills'])}")
+        print(f"  Responsibilities: {len(structured_jd['responsibilities'])}")
+        print(f"  Requirements: {len(structured_jd['requirements'])}")
+        
+        return structured_jd
+    
     def _fallback_parse(self, jd_text: str, source_url: Optional[str] = None) -> Dict:
         """Fallback parser if AI parsing fails"""
         return {
@@ -282,6 +447,10 @@ Return the result as a JSON object with these exact keys:
     
     def get_keywords_for_embedding(self, jd_structured: Dict) -> str:
         """Combine structured data into a text for embedding"""
+        return self._build_embedding_text(jd_structured)
+    
+    @staticmethod
+    def _build_embedding_text(jd_structured: Dict) -> str:
         keywords_text = f"{jd_structured['role']} "
         keywords_text += " ".join(jd_structured['skills']) + " "
         keywords_text += " ".join(jd_structured['keywords']) + " "
@@ -4,79 +4,236 @@ Coordinates all modules for ATS resume optimization
 """
 
 import json
+import hashlib
 import yaml
+import orjson
 import os
+import importlib.util
+import httpx
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from types import GeneratorType
+from functools import cached_property
+from typing import Dict, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
-from profile_ingester import ProfileIngester
-from embedding_store import EmbeddingStore
-from job_parser import JobParser
-from resume_parser import ResumeParser
-from alignment_engine import AlignmentEngine
-from rewrite_engine import RewriteEngine
-from github_integration import GitHubIntegration
-from profile_analyzer import ProfileAnalyzer
+# Component modules pull in torch, sentence-transformers, FAISS, PyGithub, etc.,
+# so they are imported on first use of each component rather than here
+if TYPE_CHECKING:
+    from embedding_store import EmbeddingStore
+
+
+# Connection limits of the shared HTTP pool, also used for the rewrite engine's async pool
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _dumps_indented(value, indent: bytes) -> bytes:
+    """orjson-encode a value nested under the given indentation"""
+    return orjson.dumps(value, option=_JSON_OPTIONS, default=str).replace(b"\n", b"\n" + indent)
+
+
+def _iter_json_chunks(data):
+    """
+    Indented JSON for data, encoded one top-level entry (and one top-level list/generator item) at a time
+    Produces the same bytes as a single orjson.dumps with OPT_INDENT_2
+    """
+    if not isinstance(data, dict) or not data:
+        yield _dumps_indented(data, b"")
+        return
+    
+    yield b"{"
+    for i, (key, value) in enumerate(data.items()):
+        yield (b"," if i else b"") + b"\n  " + orjson.dumps(key if isinstance(key, str) else str(key)) + b": "
+        if isinstance(value, (list, GeneratorType)):
+            # Generators are consumed item by item and written as arrays
+            empty = True
+            for item in value:
+                yield (b"[" if empty else b",") + b"\n    " + _dumps_indented(item, b"    ")
+                empty = False
+            yield b"[]" if empty else b"\n  ]"
+        else:
+            yield _dumps_indented(value, b"  ")
+    yield b"\n}"
+
+
+def write_json_atomic(path: str, data):
+    """
+    Stream data as indented JSON to a temp file, then atomically replace the target
+    Each top-level entry is encoded and written on its own, so the full payload is never held in memory
+    """
+    target = Path(path)
+    tmp_path = target.with_name(target.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in _iter_json_chunks(data):
+                f.write(chunk)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
 
 
 class ATSResumeOptimizer:
     """Main orchestrator for ATS resume optimization workflow"""
     
-    def __init__(self, config_path: str = "config.yaml"):
-        self.config = self._load_config(config_path)
+    # Components holding no credentials or per-run state, so for_run copies can share them
+    _SHARED_COMPONENTS = ("http_client", "embedding_store")
+    
+    def __init__(self, config_path: str = "config.yaml", config: Optional[Dict] = None):
+        """Load config from config_path, or use the given config dict as-is"""
+        self.config = config if config is not None else self._load_config(config_path)
         load_dotenv()
         
-        self.profile_ingester = ProfileIngester(
+        self.output_dir = Path(self.config.get("output", {}).get("output_dir", "output"))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.user_profile = None
+        self.profile_capabilities = None
+        self.match_analysis = None
+        self.job_description = None
+        self.resume_parser = None
+    
+    @cached_property
+    def http_client(self) -> httpx.Client:
+        """One keep-alive connection pool shared by every OpenAI client (HTTP/2 if h2 is installed)"""
+        return httpx.Client(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=_HTTP_LIMITS,
+            timeout=60
+        )
+    
+    @cached_property
+    def profile_ingester(self):
+        from profile_ingester import ProfileIngester
+        cache_dir, cache_ttl = self._cache_settings()
+        return ProfileIngester(
             github_token=self.config.get("github", {}).get("token") or os.getenv("GITHUB_TOKEN"),
-            github_username=self.config.get("github", {}).get("username") or os.getenv("GITHUB_USERNAME")
+            github_username=self.config.get("github", {}).get("username") or os.getenv("GITHUB_USERNAME"),
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl
         )
-        
-        self.embedding_store = EmbeddingStore(
+    
+    @cached_property
+    def embedding_store(self) -> "EmbeddingStore":
+        from embedding_store import EmbeddingStore
+        return EmbeddingStore(
             model_name=self.config.get("embeddings", {}).get("model", "all-MiniLM-L6-v2"),
-            db_path=self.config.get("embeddings", {}).get("vector_db_path", "embeddings_db")
+            db_path=self.config.get("embeddings", {}).get("vector_db_path", "embeddings_db"),
+            index_type=self.config.get("embeddings", {}).get("index_type", "flat"),
+            batch_size=self.config.get("embeddings", {}).get("batch_size", 64),
+            num_threads=self.config.get("embeddings", {}).get("num_threads"),
+            backend=self.config.get("embeddings", {}).get("backend", "torch"),
+            precision=self.config.get("embeddings", {}).get("precision", "fp32")
         )
-        
-        openai_api_key = self.config.get("openai", {}).get("api_key") or os.getenv("OPENAI_API_KEY")
-        parsing_model = self.config.get("openai_settings", {}).get("parsing_model") or \
-                       self.config.get("openai_settings", {}).get("model", "gpt-4o-mini")
-        
-        self.job_parser = JobParser(
-            api_key=openai_api_key,
-            model=parsing_model
+    
+    @cached_property
+    def job_parser(self):
+        from job_parser import JobParser
+        cache_dir, cache_ttl = self._cache_settings()
+        return JobParser(
+            api_key=self._openai_api_key(),
+            model=self._parsing_model(),
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            http_client=self.http_client
         )
-        self.alignment_engine = AlignmentEngine(
+    
+    @cached_property
+    def alignment_engine(self):
+        from alignment_engine import AlignmentEngine
+        return AlignmentEngine(
             embedding_store=self.embedding_store,
             similarity_threshold=self.config.get("analysis", {}).get("similarity_threshold", 0.6),
             rewrite_threshold=self.config.get("analysis", {}).get("rewrite_threshold", 0.4),
-            keep_threshold=self.config.get("analysis", {}).get("keep_threshold", 0.75)
+            keep_threshold=self.config.get("analysis", {}).get("keep_threshold", 0.75),
+            prefilter_max_length=self.config.get("analysis", {}).get("prefilter_max_length", 0)
         )
-        
-        self.rewrite_engine = RewriteEngine(
-            api_key=self.config.get("openai", {}).get("api_key") or os.getenv("OPENAI_API_KEY"),
+    
+    @cached_property
+    def rewrite_engine(self):
+        from rewrite_engine import RewriteEngine
+        cache_dir, cache_ttl = self._cache_settings()
+        return RewriteEngine(
+            api_key=self._openai_api_key(),
             model=self.config.get("openai_settings", {}).get("model", "gpt-4-turbo-preview"),
             temperature=self.config.get("openai_settings", {}).get("temperature", 0.3),
-            max_tokens=self.config.get("openai_settings", {}).get("max_tokens", 500)
+            max_tokens=self.config.get("openai_settings", {}).get("max_tokens", 500),
+            http_client=self.http_client,
+            max_concurrency=self.config.get("openai_settings", {}).get("max_concurrency", 8),
+            max_requests_per_minute=self.config.get("openai_settings", {}).get("max_requests_per_minute"),
+            max_tokens_per_minute=self.config.get("openai_settings", {}).get("max_tokens_per_minute"),
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            cheap_model=self.config.get("openai_settings", {}).get("cheap_model", "gpt-4o-mini"),
+            http_limits=_HTTP_LIMITS
         )
-        
-        self.github_integration = GitHubIntegration(
+    
+    @cached_property
+    def github_integration(self):
+        from github_integration import GitHubIntegration
+        return GitHubIntegration(
             token=self.config.get("github", {}).get("token") or os.getenv("GITHUB_TOKEN"),
             repo_owner=self.config.get("repository", {}).get("owner"),
             repo_name=self.config.get("repository", {}).get("name"),
-            branch=self.config.get("repository", {}).get("branch", "main")
+            branch=self.config.get("repository", {}).get("branch", "main"),
+            local_repo_path=self.config.get("repository", {}).get("local_path")
+            if self.config.get("repository", {}).get("use_local_git", False) else None
         )
-        
-        self.profile_analyzer = ProfileAnalyzer(
-            api_key=openai_api_key,
-            model=parsing_model
+    
+    @cached_property
+    def profile_analyzer(self):
+        from profile_analyzer import ProfileAnalyzer
+        cache_dir, cache_ttl = self._cache_settings()
+        return ProfileAnalyzer(
+            api_key=self._openai_api_key(),
+            model=self._parsing_model(),
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            http_client=self.http_client
         )
-        
+    
+    def _openai_api_key(self) -> Optional[str]:
+        return self.config.get("openai", {}).get("api_key") or os.getenv("OPENAI_API_KEY")
+    
+    def _parsing_model(self) -> str:
+        return self.config.get("openai_settings", {}).get("parsing_model") or \
+               self.config.get("openai_settings", {}).get("model", "gpt-4o-mini")
+    
+    def _cache_settings(self):
+        """(cache_dir, ttl) for the on-disk response cache; cache_dir is None when disabled"""
+        cache_config = self.config.get("cache", {})
+        cache_dir = cache_config.get("dir", "cache") if cache_config.get("enabled", True) else None
+        return cache_dir, cache_config.get("ttl")
+    
+    @classmethod
+    def from_dict(cls, config: Dict) -> "ATSResumeOptimizer":
+        """Create an optimizer from an in-memory config dict, skipping the YAML file"""
+        return cls(config=config)
+    
+    def reset(self):
+        """Clear per-run state so a cached optimizer can be reused for a new run"""
         self.user_profile = None
         self.profile_capabilities = None
         self.match_analysis = None
         self.job_description = None
         self.resume_parser = None
     
+    def for_run(self, config: Optional[Dict] = None) -> "ATSResumeOptimizer":
+        """
+        New optimizer for one run that reuses this one's shared components (HTTP pool, embedding
+        model). API clients, the alignment engine (which holds the JD) and per-run state are built
+        fresh, from config (credentials included) when given, so concurrent runs stay independent
+        """
+        run = ATSResumeOptimizer(config=config if config is not None else self.config)
+        for name in self._SHARED_COMPONENTS:
+            if name in self.__dict__:
+                run.__dict__[name] = self.__dict__[name]
+        return run
+    
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from YAML file"""
         if not os.path.exists(config_path):
@@ -99,7 +256,7 @@ class ATSResumeOptimizer:
         print(f"✓ Profile ingested: {len(self.user_profile.get('bullets', []))} bullets extracted")
         return self.user_profile
     
-    def step2_create_embedding_store(self, rebuild: bool = False) -> EmbeddingStore:
+    def step2_create_embedding_store(self, rebuild: bool = False) -> "EmbeddingStore":
         """Step 2: Create embedding store for user data"""
         print("\n=== STEP 2: Creating Embedding Store ===")
         
@@ -108,9 +265,17 @@ class ATSResumeOptimizer:
             "index"
         )
         
+        # Reuse the saved index only if it was built from the same profile data
+        if not rebuild and self.user_profile is not None and self.needs_rebuild(self.user_profile):
+            print("Profile data changed since the index was built. Rebuilding...")
+            rebuild = True
+        
         if not rebuild and os.path.exists(f"{embedding_path}.faiss"):
             try:
-                self.embedding_store.load(embedding_path)
+                self.embedding_store.load(
+                    embedding_path,
+                    mmap=self.config.get("embeddings", {}).get("mmap_index", False)
+                )
                 print("✓ Loaded existing embedding store")
                 return self.embedding_store
             except Exception as e:
@@ -120,24 +285,49 @@ class ATSResumeOptimizer:
         if not bullets:
             raise ValueError("No bullets found in user profile. Run step1_ingest_profile first.")
         
-        embeddings = self.embedding_store.create_embeddings(
-            texts=bullets,
-            metadata=[{"text": bullet, "source": "profile", "index": i} 
-                     for i, bullet in enumerate(bullets)]
-        )
+        # Encode and index each distinct bullet once, keeping its first position as the index
+        first_index = {}
+        for i, bullet in enumerate(bullets):
+            first_index.setdefault(bullet, i)
+        unique_bullets = list(first_index)
+        metadata = [{"text": bullet, "source": "profile", "index": i} for bullet, i in first_index.items()]
+        
+        embeddings = self.embedding_store.create_embeddings(texts=unique_bullets, metadata=metadata)
         
         self.embedding_store.build_index(
             embeddings=embeddings,
-            texts=bullets,
-            metadata=[{"text": bullet, "source": "profile", "index": i} 
-                     for i, bullet in enumerate(bullets)]
+            texts=unique_bullets,
+            metadata=metadata
         )
         
         self.embedding_store.save(embedding_path)
-        print(f"✓ Created embedding store with {len(bullets)} entries")
+        with open(self._profile_digest_path(), 'w') as f:
+            f.write(self._profile_digest(self.user_profile))
+        print(f"✓ Created embedding store with {len(unique_bullets)} entries")
         
         return self.embedding_store
     
+    def needs_rebuild(self, profile_data: Dict) -> bool:
+        """True if the saved embedding index is missing or was built from different profile data"""
+        db_path = self.config.get("embeddings", {}).get("vector_db_path", "embeddings_db")
+        if not os.path.exists(os.path.join(db_path, "index.faiss")):
+            return True
+        try:
+            with open(self._profile_digest_path(), 'r') as f:
+                return f.read().strip() != self._profile_digest(profile_data)
+        except FileNotFoundError:
+            return True
+    
+    def _profile_digest_path(self) -> str:
+        """Path of the profile digest stored alongside the embedding index"""
+        db_path = self.config.get("embeddings", {}).get("vector_db_path", "embeddings_db")
+        return os.path.join(db_path, "digest.txt")
+    
+    @staticmethod
+    def _profile_digest(profile_data: Dict) -> str:
+        """Stable SHA-256 of the profile data"""
+        return hashlib.sha256(json.dumps(profile_data, sort_keys=True, default=str).encode()).hexdigest()
+    
     def step2b_analyze_profile(self) -> Dict:
         """Step 2b: Analyze profile capabilities"""
         print("\n=== STEP 2b: Analyzing Profile Capabilities ===")
@@ -155,10 +345,11 @@ class ATSResumeOptimizer:
         
         return self.profile_capabilities
     
-    def step3_ingest_job_description(self, jd_input: str) -> Dict:
+    def step3_ingest_job_description(self, jd_input: str, match_profile: bool = True) -> Dict:
         """
         Step 3: Ingest and parse job description
         Accepts either a URL or raw text
+        match_profile=False defers step 3b (e.g. while profile analysis is still running)
         """
         print("\n=== STEP 3: Ingesting Job Description ===")
         
@@ -176,28 +367,34 @@ class ATSResumeOptimizer:
         print(f"  Skills: {len(self.job_description.get('skills', []))}")
         print(f"  Requirements: {len(self.job_description.get('requirements', []))}")
         
-        if self.profile_capabilities:
-            print("\n=== STEP 3b: Matching Profile with Job Requirements ===")
-            self.match_analysis = self.profile_analyzer.match_profile_with_job(
-                profile_capabilities=self.profile_capabilities,
-                job_description=self.job_description
-            )
-            print(f"✓ Profile matched: {self.match_analysis.get('match_score', 0)}% match score")
+        if match_profile:
+            self.step3b_match_profile()
         
         return self.job_description
     
+    def step3b_match_profile(self) -> Optional[Dict]:
+        """Step 3b: Match analyzed profile capabilities with the parsed job description"""
+        if not self.profile_capabilities or not self.job_description:
+            return None
+        
+        print("\n=== STEP 3b: Matching Profile with Job Requirements ===")
+        self.match_analysis = self.profile_analyzer.match_profile_with_job(
+            profile_capabilities=self.profile_capabilities,
+            job_description=self.job_description
+        )
+        print(f"✓ Profile matched: {self.match_analysis.get('match_score', 0)}% match score")
+        return self.match_analysis
+    
     def step4_analyze_resume(self, resume_path: str) -> list:
         """Step 4: Analyze current resume bullets"""
         print("\n=== STEP 4: Analyzing Resume ===")
         
-        openai_api_key = self.config.get("openai", {}).get("api_key") or os.getenv("OPENAI_API_KEY")
-        parsing_model = self.config.get("openai_settings", {}).get("parsing_model") or \
-                       self.config.get("openai_settings", {}).get("model", "gpt-4o-mini")
-        
+        from resume_parser import ResumeParser
         self.resume_parser = ResumeParser(
             tex_file_path=resume_path,
-            api_key=openai_api_key,
-            model=parsing_model
+            api_key=self._openai_api_key(),
+            model=self._parsing_model(),
+            http_client=self.http_client
         )
         self.resume_parser.load_resume()
         bullets = self.resume_parser.extract_bullets()
@@ -208,10 +405,7 @@ class ATSResumeOptimizer:
             match_analysis=self.match_analysis
         )
         
-        decision_counts = {"KEEP": 0, "REWRITE": 0, "DE_EMPHASIZE": 0, "ADD": 0}
-        for analysis in analyses:
-            decision = analysis["decision"]
-            decision_counts[decision] = decision_counts.get(decision, 0) + 1
+        decision_counts = Counter(analysis["decision"] for analysis in analyses)
         
         print(f"✓ Analyzed {len(bullets)} bullets")
         print(f"  Keep: {decision_counts['KEEP']}")
@@ -221,41 +415,87 @@ class ATSResumeOptimizer:
         
         return analyses
     
-    def step5_rewrite_bullets(self, analyses: list) -> list:
-        """Step 5: Rewrite bullets via OpenAI API"""
+    def step5_rewrite_bullets(self, analyses: list, bulk: Optional[bool] = None) -> list:
+        """
+        Step 5: Rewrite bullets via OpenAI API
+        bulk=True sends all bullets in one request (defaults to openai_settings.bulk_rewrite)
+        """
+        if bulk is None:
+            bulk = self.config.get("openai_settings", {}).get("bulk_rewrite", False)
+        if bulk:
+            return self.step5_rewrite_bullets_bulk(analyses)
+        
         print("\n=== STEP 5: Rewriting Bullets ===")
         
         jd_keywords = self.job_parser.get_keywords_for_embedding(self.job_description)
         
+        to_rewrite = [analysis for analysis in analyses if analysis["decision"] == "REWRITE"]
+        
+        for analysis in to_rewrite:
+            print(f"  Rewriting: {analysis['bullet']['text'][:50]}...")
+        
+        # The engine issues the OpenAI calls concurrently (the round-trips dominate this step) and
+        # returns results in input order; replace_bullet then runs here on the main thread
+        rewrite_kwargs = dict(
+            bullets=[analysis["bullet"] for analysis in to_rewrite],
+            job_keywords=jd_keywords,
+            relevant_profile_entries=[analysis.get("relevant_entries", []) for analysis in to_rewrite],
+            match_analysis=self.match_analysis,
+            profile_capabilities=self.profile_capabilities
+        )
+        group_size = self.config.get("openai_settings", {}).get("rewrite_group_size", 1)
+        if group_size > 1:
+            rewritten_texts = self.rewrite_engine.rewrite_bullets_grouped(**rewrite_kwargs, group_size=group_size)
+        else:
+            rewritten_texts = self.rewrite_engine.rewrite_bullets(**rewrite_kwargs)
+        
+        self._apply_rewrites(to_rewrite, rewritten_texts)
+        return analyses
+    
+    def step5_rewrite_bullets_bulk(self, analyses: list) -> list:
+        """Step 5 (bulk): Rewrite all REWRITE bullets with a single OpenAI request"""
+        print("\n=== STEP 5: Rewriting Bullets (bulk) ===")
+        
+        jd_keywords = self.job_parser.get_keywords_for_embedding(self.job_description)
+        to_rewrite = [analysis for analysis in analyses if analysis["decision"] == "REWRITE"]
+        
+        rewritten_texts = self.rewrite_engine.rewrite_bullets_bulk(
+            bullets=[analysis["bullet"] for analysis in to_rewrite],
+            job_keywords=jd_keywords,
+            relevant_profile_entries=[analysis.get("relevant_entries", []) for analysis in to_rewrite],
+            match_analysis=self.match_analysis,
+            profile_capabilities=self.profile_capabilities
+        )
+        
+        self._apply_rewrites(to_rewrite, rewritten_texts)
+        return analyses
+    
+    def _apply_rewrites(self, to_rewrite: list, rewritten_texts: list):
+        """Apply rewritten bullets to the resume in document order, one at a time"""
         rewritten_count = 0
-        for analysis in analyses:
-            if analysis["decision"] == "REWRITE":
-                bullet = analysis["bullet"]
-                relevant_entries = analysis.get("relevant_entries", [])
-                
-                print(f"  Rewriting: {bullet['text'][:50]}...")
-                
-                rewritten_text = self.rewrite_engine.rewrite_bullet(
-                    bullet=bullet,
-                    job_keywords=jd_keywords,
-                    relevant_profile_entries=relevant_entries,
-                    match_analysis=self.match_analysis,
-                    profile_capabilities=self.profile_capabilities
-                )
-                
-                self.resume_parser.replace_bullet(bullet, rewritten_text)
-                analysis["rewritten_text"] = rewritten_text
-                rewritten_count += 1
-            
-            elif analysis["decision"] == "DE_EMPHASIZE":
-                pass
+        for analysis, rewritten_text in zip(to_rewrite, rewritten_texts):
+            self.resume_parser.replace_bullet(analysis["bullet"], rewritten_text)
+            analysis["rewritten_text"] = rewritten_text
+            rewritten_count += 1
         
         print(f"✓ Rewrote {rewritten_count} bullets")
-        return analyses
     
     def step6_generate_documents(self, role_match_score: float) -> Dict:
         return {}
     
+    @staticmethod
+    def _iter_analysis_summaries(analyses: list):
+        """Serializable summary of each analysis for the JSON output"""
+        for a in analyses:
+            yield {
+                "bullet_text": a["bullet"]["text"],
+                "decision": a["decision"],
+                "jd_similarity": a["jd_similarity"],
+                "profile_alignment": a.get("profile_alignment", 0),
+                "reasoning": a["reasoning"],
+                "rewritten_text": a.get("rewritten_text")
+            }
+    
     def step7_commit_to_github(self, analyses: list, role_match_score: float, 
                                documents: Dict, commit_message: Optional[str] = None):
         """Step 7: Commit and push changes to GitHub"""
@@ -265,11 +505,10 @@ class ATSResumeOptimizer:
             role = self.job_description.get("role", "position")
             commit_message = f"Optimize resume for {role} (Match: {role_match_score}%)"
         
-        output_dir = self.config.get("output", {}).get("output_dir", "output")
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = self.output_dir
         
         resume_path = self.config.get("repository", {}).get("resume_file", "main.tex")
-        self.resume_parser.save_resume(os.path.join(output_dir, resume_path))
+        self.resume_parser.save_resume(str(output_dir / resume_path))
         
         output_data = {
             "role_match_score": role_match_score,
@@ -282,31 +521,22 @@ class ATSResumeOptimizer:
                 "strengths": self.match_analysis.get("strengths", []) if self.match_analysis else [],
                 "recommendations": self.match_analysis.get("recommendations", []) if self.match_analysis else []
             } if self.match_analysis else {},
-            "analyses": [
-                {
-                    "bullet_text": a["bullet"]["text"],
-                    "decision": a["decision"],
-                    "jd_similarity": a["jd_similarity"],
-                    "profile_alignment": a.get("profile_alignment", 0),
-                    "reasoning": a["reasoning"],
-                    "rewritten_text": a.get("rewritten_text")
-                }
-                for a in analyses
-            ],
+            # Summaries are built one at a time as they are written, not as a second full list
+            "analyses": self._iter_analysis_summaries(analyses),
             "documents": documents
         }
         
-        json_path = os.path.join(output_dir, 
-                                self.config.get("output", {}).get("json_output", "analysis_results.json"))
-        with open(json_path, 'w') as f:
-            json.dump(output_data, f, indent=2)
+        json_path = output_dir / self.config.get("output", {}).get("json_output", "analysis_results.json")
+        write_json_atomic(json_path, output_data)
+        # The generator is spent; return the same summaries that were written
+        output_data["analyses"] = list(self._iter_analysis_summaries(analyses))
         
         print(f"✓ Saved all outputs to {output_dir}/")
         
         if self.config.get("repository", {}).get("owner") and self.github_integration.token:
             try:
                 self.github_integration.commit_and_push(
-                    file_path=os.path.join(output_dir, resume_path),
+                    file_path=str(output_dir / resume_path),
                     commit_message=commit_message,
                     branch=self.config.get("repository", {}).get("branch", "main")
                 )
@@ -329,9 +559,20 @@ class ATSResumeOptimizer:
         print("="*60)
         
         self.step1_ingest_profile(scholar_id=scholar_id, author_name=author_name)
-        self.step2_create_embedding_store(rebuild=rebuild_embeddings)
-        self.step2b_analyze_profile()
-        self.step3_ingest_job_description(jd_input)
+        
+        # Profile analysis is a network-bound OpenAI call independent of the embedding
+        # build and JD parsing, so it runs in the background while those proceed.
+        # cached_property has no lock, so build the shared HTTP pool and the analyzer here
+        # first rather than letting both threads race to create them
+        self.http_client
+        self.profile_analyzer
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            profile_future = executor.submit(self.step2b_analyze_profile)
+            self.step2_create_embedding_store(rebuild=rebuild_embeddings)
+            self.step3_ingest_job_description(jd_input, match_profile=False)
+            profile_future.result()
+        self.step3b_match_profile()
+        
         analyses = self.step4_analyze_resume(resume_path)
         
         if self.match_analysis and self.match_analysis.get("match_score"):
@@ -359,6 +600,9 @@ class ATSResumeOptimizer:
 
 if __name__ == "__main__":
     import sys
+    import logging
+    
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     
     if len(sys.argv) < 3:
         print("Usage: python main.py <job_description_url_or_file> <resume_file> [scholar_id/author_name]")
@@ -3,26 +3,118 @@ Profile Analyzer Module
 Analyzes user profile to extract capabilities and match with job requirements
 """
 
-import json
-from typing import Dict, List, Tuple
+import os
+import re
+import httpx
+import numpy as np
+from itertools import chain
+from typing import Dict, List, Literal, Optional, Tuple, Type
 from openai import OpenAI
+from pydantic import BaseModel
+from response_cache import ResponseCache
+
+
+# Words for recommendation matching; keeps "c++", "c#" and the like intact
+_TOKEN_RE = re.compile(r"\w[\w+#]*")
+
+
+def _incidence_matrix(rows: List[List[int]], width: int) -> np.ndarray:
+    """0/1 float32 matrix with a 1 at (i, j) for every column id j listed in rows[i]"""
+    # CSR-style ragged layout (flat ids + per-row lengths) filled with one scatter
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    flat_ids = np.fromiter(chain.from_iterable(rows), dtype=np.int32, count=int(lengths.sum()))
+    matrix = np.zeros((len(rows), width), dtype=np.float32)
+    matrix[np.repeat(np.arange(len(rows)), lengths), flat_ids] = 1.0
+    return matrix
+
+
+class ProfileCapabilities(BaseModel):
+    """Structured output schema for analyze_profile_capabilities"""
+    core_skills: List[str]
+    technologies: List[str]
+    experiences: List[str]
+    projects: List[str]
+    achievements: List[str]
+    domain_expertise: List[str]
+    education_background: str
+
+
+class SkillMatch(BaseModel):
+    skill: str
+    evidence: str
+
+
+class Recommendation(BaseModel):
+    action: Literal["EMPHASIZE", "ADD", "REWRITE"]
+    skill_or_topic: str
+    evidence: str
+    suggestion: str
+
+
+class MatchAnalysis(BaseModel):
+    """Structured output schema for match_profile_with_job (skill_matches is converted to a dict)"""
+    skill_matches: List[SkillMatch]
+    missing_skills: List[str]
+    strengths: List[str]
+    recommendations: List[Recommendation]
+    match_score: int
 
 
 class ProfileAnalyzer:
     """Analyzes user profile to understand capabilities and match with job requirements"""
     
-    def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
-        """Initialize with OpenAI API key"""
+    def __init__(self, api_key: str = None, model: str = "gpt-4o-mini", cache_dir: Optional[str] = "cache",
+                 cache_ttl: Optional[float] = None, http_client: Optional[httpx.Client] = None):
+        """
+        Initialize with OpenAI API key (cache_dir=None disables the on-disk cache)
+        http_client: optional shared httpx client so several components reuse one connection pool
+        """
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         else:
-            import os
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OpenAI API key required")
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         
         self.model = model
+        
+        # Responses keyed on model + prompts, so unchanged profiles/JDs skip the API call
+        self.cache = ResponseCache(os.path.join(cache_dir, "profile_analyzer"), ttl=cache_ttl) if cache_dir else None
+        self._rec_index = None  # (match_analysis, prepared recommendation index)
+    
+    def _complete_structured(self, system_prompt: str, user_prompt: str, temperature: float,
+                             schema: Type[BaseModel]) -> Dict:
+        """
+        Structured-output chat completion parsed into the given pydantic schema, returned as a dict
+        Served from the response cache when the prompts are unchanged
+        """
+        cache_key = None
+        if self.cache:
+            cache_key = ResponseCache.make_key(self.model, str(temperature), schema.__name__,
+                                               system_prompt, user_prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        completion = self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format=schema,
+            temperature=temperature
+        )
+        
+        message = completion.choices[0].message
+        if message.parsed is None:
+            raise ValueError(f"Model refused to respond: {message.refusal}")
+        
+        result = message.parsed.model_dump()
+        if cache_key:
+            self.cache.set(cache_key, result)
+        return result
     
     def analyze_profile_capabilities(self, user_profile: Dict) -> Dict:
         """
@@ -61,27 +153,9 @@ Return a JSON object with these keys:
 }}"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            
-            capabilities = {
-                "core_skills": result.get("core_skills", []),
-                "technologies": result.get("technologies", []),
-                "experiences": result.get("experiences", []),
-                "projects": result.get("projects", []),
-                "achievements": result.get("achievements", []),
-                "domain_expertise": result.get("domain_expertise", []),
-                "education_background": result.get("education_background", "Not specified")
-            }
+            # The schema guarantees every field is present
+            capabilities = self._complete_structured(system_prompt, user_prompt, temperature=0.2,
+                                                     schema=ProfileCapabilities)
             
             print(f"✓ Profile analyzed: {len(capabilities['core_skills'])} skills, {len(capabilities['projects'])} projects")
             
@@ -128,7 +202,7 @@ Requirements: {job_description.get('requirements', [])}
 
 Analyze and return JSON with:
 {{
-    "skill_matches": {{"skill": "evidence from profile", ...}},
+    "skill_matches": [{{"skill": "...", "evidence": "evidence from profile"}}, ...],
     "missing_skills": ["skill1", "skill2", ...],
     "strengths": ["strength1", "strength2", ...],
     "recommendations": [
@@ -143,24 +217,11 @@ Analyze and return JSON with:
 }}"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            
-            match_analysis = {
-                "skill_matches": result.get("skill_matches", {}),
-                "missing_skills": result.get("missing_skills", []),
-                "strengths": result.get("strengths", []),
-                "recommendations": result.get("recommendations", []),
-                "match_score": result.get("match_score", 0)
+            match_analysis = self._complete_structured(system_prompt, user_prompt, temperature=0.3,
+                                                       schema=MatchAnalysis)
+            # Downstream code expects skill -> evidence
+            match_analysis["skill_matches"] = {
+                match["skill"]: match["evidence"] for match in match_analysis["skill_matches"]
             }
             
             print(f"✓ Profile matched with job: {match_analysis['match_score']}% match")
@@ -185,32 +246,71 @@ Analyze and return JSON with:
         """
         Get specific recommendations for a resume bullet based on profile analysis
         """
-        bullet_text = bullet["text"]
+        return self.get_recommendations_for_bullets([bullet], match_analysis, profile_capabilities)[0]
+    
+    def get_recommendations_for_bullets(self, bullets: List[Dict], match_analysis: Dict,
+                                        profile_capabilities: Dict) -> List[Dict]:
+        """
+        Get recommendations for many bullets, tokenizing the match analysis once
+        A recommendation or strength applies when it shares a word with the bullet
+        """
+        recs, strengths, vocab, topic_matrix = self._recommendation_index(match_analysis)
+        
+        # Score all bullets against all recommendations and strengths with one matrix product
+        bullet_lowers = [bullet["text"].lower() for bullet in bullets]
+        bullet_rows = [[vocab[token] for token in _TOKEN_RE.findall(text) if token in vocab]
+                       for text in bullet_lowers]
+        hits = (_incidence_matrix(bullet_rows, len(vocab)) @ topic_matrix.T) > 0
         
-        # Check if bullet should be enhanced based on recommendations
-        relevant_recommendations = []
+        results = []
+        for bullet, bullet_lower, bullet_hits in zip(bullets, bullet_lowers, hits):
+            # Check if recommendation is relevant to this bullet
+            relevant_recommendations = [
+                rec for (rec, skill_or_topic), hit in zip(recs, bullet_hits)
+                if hit or skill_or_topic in bullet_lower
+            ]
+            
+            # Check if bullet mentions a strength that should be emphasized
+            relevant_strengths = [strengths[j] for j in np.flatnonzero(bullet_hits[len(recs):])]
+            
+            results.append({
+                "bullet": bullet,
+                "relevant_recommendations": relevant_recommendations,
+                "relevant_strengths": relevant_strengths,
+                "should_enhance": len(relevant_recommendations) > 0 or len(relevant_strengths) > 0,
+                "enhancement_evidence": [rec.get("evidence", "") for rec in relevant_recommendations]
+            })
+        
+        return results
+    
+    def _recommendation_index(self, match_analysis: Dict) -> Tuple[list, list, Dict[str, int], np.ndarray]:
+        """
+        Lowercased/tokenized recommendations and strengths for a match analysis
+        Built once per match analysis and reused by every later bullet lookup
+        """
+        if self._rec_index is not None and self._rec_index[0] is match_analysis:
+            return self._rec_index[1]
+        
+        recs = []
+        rec_tokens = []
         for rec in match_analysis.get("recommendations", []):
-            action = rec.get("action", "")
             skill_or_topic = rec.get("skill_or_topic", "").lower()
-            
-            # Check if recommendation is relevant to this bullet
-            if skill_or_topic and (skill_or_topic in bullet_text.lower() or 
-                                  any(word in bullet_text.lower() for word in skill_or_topic.split())):
-                relevant_recommendations.append(rec)
+            if skill_or_topic:
+                recs.append((rec, skill_or_topic))
+                rec_tokens.append(_TOKEN_RE.findall(skill_or_topic))
         
-        # Check if bullet mentions a strength that should be emphasized
-        relevant_strengths = []
-        for strength in match_analysis.get("strengths", []):
-            if any(word in bullet_text.lower() for word in strength.lower().split()[:3]):
-                relevant_strengths.append(strength)
+        strengths = match_analysis.get("strengths", [])
+        strength_tokens = [_TOKEN_RE.findall(" ".join(strength.lower().split()[:3])) for strength in strengths]
         
-        return {
-            "bullet": bullet,
-            "relevant_recommendations": relevant_recommendations,
-            "relevant_strengths": relevant_strengths,
-            "should_enhance": len(relevant_recommendations) > 0 or len(relevant_strengths) > 0,
-            "enhancement_evidence": [rec.get("evidence", "") for rec in relevant_recommendations]
-        }
+        # Map every recommendation/strength word to a column
+        vocab = {}
+        topic_rows = [[vocab.setdefault(token, len(vocab)) for token in tokens]
+                      for tokens in rec_tokens + strength_tokens]
+        topic_matrix = _incidence_matrix(topic_rows, len(vocab))
+        
+        index = (recs, strengths, vocab, topic_matrix)
+        self._rec_index = (match_analysis, index)
+        return index
     
     def _prepare_profile_summary(self, user_profile: Dict) -> str:
         """Prepare a summary of user profile for AI analysis"""
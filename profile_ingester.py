@@ -3,23 +3,109 @@ User Profile Ingestion Module
 Fetches and parses GitHub, LinkedIn, and Google Scholar profiles
 """
 
+import os
 import json
+import base64
 import re
 import requests
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Iterator, List, Dict, Optional
 from github import Github
 from scholarly import scholarly
 from bs4 import BeautifulSoup
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from response_cache import ResponseCache
+
+
+# README list items
+_BULLET_RE = re.compile(r'^[-*+]\s+(.+)$')
+_NUMBERED_RE = re.compile(r'^\d+[\.)]\s+(.+)$')
+
+# Page number of the rel="last" entry in a GitHub Link header
+_LAST_PAGE_RE = re.compile(r'[?&]page=(\d+)>; rel="last"')
+
+
+# README file names GitHub recognizes (REST get_readme finds any of these), most common first
+_README_NAMES = ("README.md", "readme.md", "Readme.md", "README.rst", "README", "README.txt",
+                 "README.markdown", "docs/README.md", ".github/README.md")
+_README_FIELDS = "\n".join(
+    f'        readme{i}: object(expression: "HEAD:{name}") {{ ... on Blob {{ text }} }}'
+    for i, name in enumerate(_README_NAMES)
+)
+
+# One GraphQL page returns what the REST path needs four calls per repository for
+_REPOS_QUERY = """
+query($login: String!, $uid: ID!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: 50, after: $cursor, isFork: false, ownerAffiliations: OWNER, privacy: PUBLIC,
+                 orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        description
+        isArchived
+        primaryLanguage { name }
+        stargazerCount
+        forkCount
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+%s
+        defaultBranchRef {
+          target { ... on Commit { history(author: {id: $uid}) { totalCount } } }
+        }
+      }
+    }
+  }
+}
+""" % _README_FIELDS
+
+
+class _RateLimiter:
+    """Spaces calls from any number of threads at least min_interval seconds apart"""
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
 
 
 class ProfileIngester:
     """Ingests user profile data from multiple sources"""
     
-    def __init__(self, github_token: str, github_username: str):
+    API_URL = "https://api.github.com"
+    GRAPHQL_URL = "https://api.github.com/graphql"
+    README_MAX_BYTES = 65536  # Only the head of a README is kept; bullets are capped at 10 anyway
+    # Scholar results carry no change marker, so they expire even when the cache ttl is unset
+    SCHOLAR_CACHE_TTL = 24 * 3600
+    SCHOLAR_MIN_INTERVAL = 0.5  # Seconds between Scholar publication fills
+    
+    def __init__(self, github_token: str, github_username: str, max_workers: int = 16,
+                 cache_dir: Optional[str] = "cache", cache_ttl: Optional[float] = None):
+        """cache_dir=None disables the on-disk cache of Scholar responses"""
         self.github_token = github_token
+        self.max_workers = max_workers  # Concurrent GitHub repo fetches
         self.github_username = github_username
-        self.github = Github(github_token) if github_token else None
+        # Keep-alive pools shared by all workers, with backoff on rate limits and gateway errors
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+                      allowed_methods=None)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry))
+        self.github = Github(github_token, pool_size=max_workers, retry=retry) if github_token else None
+        self.scholar_cache = ResponseCache(
+            os.path.join(cache_dir, "profile"),
+            ttl=cache_ttl if cache_ttl is not None else self.SCHOLAR_CACHE_TTL
+        ) if cache_dir else None
         
     def ingest_github_profile(self) -> Dict:
         """Fetch GitHub repositories, READMEs, languages, and commits"""
@@ -34,77 +120,165 @@ class ProfileIngester:
         }
         
         try:
-            user = self.github.get_user(self.github_username)
-            repos = user.get_repos()
-            
-            for repo in repos:
-                if repo.archived or repo.fork:
-                    continue
-                    
-                repo_data = {
-                    "name": repo.name,
-                    "description": repo.description,
-                    "language": repo.language,
-                    "stars": repo.stargazers_count,
-                    "forks": repo.forks_count,
-                    "topics": repo.get_topics(),
-                    "readme_content": "",
-                    "key_bullets": []
-                }
-                
-                # Fetch README
-                try:
-                    readme = repo.get_readme()
-                    readme_content = readme.decoded_content.decode('utf-8')
-                    repo_data["readme_content"] = readme_content
-                    repo_data["key_bullets"] = self._extract_bullets_from_readme(readme_content)
-                except:
-                    pass
-                
+            for repo_data in self.iter_github_repos():
                 # Aggregate languages
-                if repo.language:
-                    profile_data["languages"][repo.language] = \
-                        profile_data["languages"].get(repo.language, 0) + 1
-                
-                # Get commit count (approximate)
-                try:
-                    commits = repo.get_commits(author=user.login)
-                    commit_count = sum(1 for _ in commits[:100])  # Limit to avoid rate limits
-                    repo_data["commits"] = commit_count
-                    profile_data["total_commits"] += commit_count
-                except:
-                    repo_data["commits"] = 0
+                if repo_data["language"]:
+                    profile_data["languages"][repo_data["language"]] = \
+                        profile_data["languages"].get(repo_data["language"], 0) + 1
                 
+                profile_data["total_commits"] += repo_data["commits"]
                 profile_data["repositories"].append(repo_data)
                 profile_data["repos_count"] += 1
                 
-                # Rate limiting
-                time.sleep(0.1)
-                
         except Exception as e:
             return {"error": f"GitHub ingestion failed: {str(e)}"}
         
         return profile_data
     
+    def iter_github_repos(self) -> Iterator[Dict]:
+        """Yield repo data as it arrives, so callers need not hold every repository at once"""
+        if not self.github:
+            return
+        
+        user = self.github.get_user(self.github_username)
+        yielded = False
+        try:
+            for repo_data in self._iter_repos_graphql(user.login, user.node_id):
+                yielded = True
+                yield repo_data
+            return
+        except Exception as e:
+            if yielded:
+                raise  # Falling back now would repeat repos already yielded
+            print(f"  GraphQL repository query failed ({e}), falling back to REST")
+        
+        yield from self._iter_repos_rest(user)
+    
+    def _iter_repos_graphql(self, login: str, user_id: str) -> Iterator[Dict]:
+        """Yield every repository with its topics, README and commit count, one page per request"""
+        cursor = None
+        while True:
+            response = self.session.post(
+                self.GRAPHQL_URL,
+                json={"query": _REPOS_QUERY, "variables": {"login": login, "uid": user_id, "cursor": cursor}},
+                headers={"Authorization": f"bearer {self.github_token}"},
+                timeout=30
+            )
+            response.raise_for_status()
+            result = response.json()
+            if result.get("errors"):
+                raise Exception(result["errors"][0].get("message", "unknown error"))
+            
+            repositories = result["data"]["user"]["repositories"]
+            for node in repositories["nodes"]:
+                if node["isArchived"]:
+                    continue
+                yield self._repo_from_graphql(node)
+            
+            if not repositories["pageInfo"]["hasNextPage"]:
+                return
+            cursor = repositories["pageInfo"]["endCursor"]
+    
+    def _repo_from_graphql(self, node: Dict) -> Dict:
+        """Shape one GraphQL repository node like the REST path's repo data"""
+        readme_content = next((node[f"readme{i}"]["text"] for i in range(len(_README_NAMES))
+                               if (node.get(f"readme{i}") or {}).get("text")), "")[:self.README_MAX_BYTES]
+        
+        target = (node.get("defaultBranchRef") or {}).get("target") or {}
+        total_commits = (target.get("history") or {}).get("totalCount", 0)
+        
+        return {
+            "name": node["name"],
+            "description": node["description"],
+            "language": (node.get("primaryLanguage") or {}).get("name"),
+            "stars": node["stargazerCount"],
+            "forks": node["forkCount"],
+            "topics": [t["topic"]["name"] for t in node["repositoryTopics"]["nodes"]],
+            "readme_content": readme_content,
+            "key_bullets": self._extract_bullets_from_readme(readme_content) if readme_content else [],
+            "commits": min(total_commits, 100)  # Same cap as the REST path
+        }
+    
+    def _iter_repos_rest(self, user) -> Iterator[Dict]:
+        """REST fallback: page through the repo listing, fetching each batch's details concurrently"""
+        repos = (repo for repo in user.get_repos() if not (repo.archived or repo.fork))
+        
+        # Per-repo README/topics/commit calls are independent round-trips, so fetch a
+        # bounded batch concurrently; results come back in listing order
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                batch = list(islice(repos, self.max_workers))
+                if not batch:
+                    return
+                yield from executor.map(lambda repo: self._fetch_repo(repo, user.login), batch)
+    
+    def _fetch_repo(self, repo, login: str) -> Dict:
+        """Fetch README, topics and an approximate commit count for one repository"""
+        repo_data = {
+            "name": repo.name,
+            "description": repo.description,
+            "language": repo.language,
+            "stars": repo.stargazers_count,
+            "forks": repo.forks_count,
+            "topics": repo.get_topics(),
+            "readme_content": "",
+            "key_bullets": []
+        }
+        
+        # Fetch README
+        try:
+            readme = repo.get_readme()
+            # Decode the base64 body already returned by the readme call; decoded_content can
+            # trigger a lazy re-fetch, and very large files come back without inline content
+            raw = base64.b64decode(readme.content) if readme.content else readme.decoded_content
+            readme_content = raw[:self.README_MAX_BYTES].decode('utf-8', errors='replace')
+            repo_data["readme_content"] = readme_content
+            repo_data["key_bullets"] = self._extract_bullets_from_readme(readme_content)
+        except:
+            pass
+        
+        # Get commit count (capped at 100 like the GraphQL path)
+        try:
+            repo_data["commits"] = min(self._count_commits(repo.full_name, login), 100)
+        except:
+            repo_data["commits"] = 0
+        
+        return repo_data
+    
+    def _count_commits(self, full_name: str, login: str) -> int:
+        """Count a user's commits with one per_page=1 request: the last page number is the total"""
+        response = self.session.get(
+            f"{self.API_URL}/repos/{full_name}/commits",
+            params={"author": login, "per_page": 1},
+            headers={"Authorization": f"token {self.github_token}"},
+            timeout=30
+        )
+        response.raise_for_status()
+        match = _LAST_PAGE_RE.search(response.headers.get("Link", ""))
+        return int(match.group(1)) if match else len(response.json())
+    
     def _extract_bullets_from_readme(self, readme_content: str) -> List[str]:
         """Extract bullet points and key features from README"""
         bullets = []
+        numbered = []
         
-        # Extract markdown bullets
-        bullet_pattern = r'^[-*+]\s+(.+)$'
-        for line in readme_content.split('\n'):
-            match = re.match(bullet_pattern, line.strip())
+        # One pass over the lines; markdown bullets still come before numbered items,
+        # and the scan stops once the top 10 are bullets
+        for line in readme_content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            match = _BULLET_RE.match(line)
             if match:
                 bullets.append(match.group(1).strip())
+                if len(bullets) == 10:
+                    break
+            elif len(numbered) < 10:
+                match = _NUMBERED_RE.match(line)
+                if match:
+                    numbered.append(match.group(1).strip())
         
-        # Extract numbered lists
-        numbered_pattern = r'^\d+[\.)]\s+(.+)$'
-        for line in readme_content.split('\n'):
-            match = re.match(numbered_pattern, line.strip())
-            if match:
-                bullets.append(match.group(1).strip())
-        
-        return bullets[:10]  # Limit to top 10
+        return (bullets + numbered)[:10]  # Limit to top 10
     
     def ingest_linkedin_profile(self, profile_url: Optional[str] = None) -> Dict:
         """
@@ -134,6 +308,11 @@ class ProfileIngester:
             "h_index": 0
         }
         
+        cache_key = ResponseCache.make_key("scholar", scholar_id or "", author_name or "") if self.scholar_cache else None
+        cached = self.scholar_cache.get(cache_key) if cache_key else None
+        if cached:
+            return cached
+        
         try:
             if scholar_id:
                 search_query = scholarly.search_author_id(scholar_id)
@@ -148,9 +327,19 @@ class ProfileIngester:
             publications_data["total_citations"] = author.get("citedby", 0)
             publications_data["h_index"] = author.get("hindex", 0)
             
-            # Get publications
-            for pub in author.get("publications", [])[:20]:  # Limit to recent 20
-                filled_pub = scholarly.fill(pub)
+            # Fill publications one at a time: scholarly's module-level navigator and session
+            # are not thread-safe. The limiter keeps the rate at 2 requests/second
+            limiter = _RateLimiter(self.SCHOLAR_MIN_INTERVAL)
+            
+            def fill(pub):
+                # Listing entries that already carry an abstract and URL need no extra request
+                if pub.get("bib", {}).get("abstract") and pub.get("pub_url"):
+                    return pub
+                limiter.wait()
+                return scholarly.fill(pub)
+            
+            pubs = author.get("publications", [])[:20]  # Limit to recent 20
+            for filled_pub in map(fill, pubs):
                 pub_data = {
                     "title": filled_pub.get("bib", {}).get("title", ""),
                     "authors": filled_pub.get("bib", {}).get("author", []),
@@ -161,54 +350,49 @@ class ProfileIngester:
                     "url": filled_pub.get("pub_url", "")
                 }
                 publications_data["publications"].append(pub_data)
-                time.sleep(0.5)  # Rate limiting
                 
         except Exception as e:
             return {"error": f"Google Scholar ingestion failed: {str(e)}"}
         
+        if cache_key:
+            self.scholar_cache.set(cache_key, publications_data)
         return publications_data
     
     def convert_to_bullets(self, profile_data: Dict) -> List[str]:
         """Convert all profile data into bullet-like text for embedding"""
         bullets = []
+        append = bullets.append
         
-        # GitHub bullets
-        if "repositories" in profile_data:
-            for repo in profile_data["repositories"]:
-                if repo.get("description"):
-                    bullets.append(f"Built {repo['name']}: {repo['description']}")
-                bullets.extend(repo.get("key_bullets", []))
-                if repo.get("language"):
-                    bullets.append(f"Developed {repo['name']} in {repo['language']}")
+        # GitHub bullets (description, README bullets, language, kept in per-repo order)
+        for repo in profile_data.get("repositories", ()):
+            name = repo['name']
+            if repo.get("description"):
+                append(f"Built {name}: {repo['description']}")
+            bullets += repo.get("key_bullets", ())
+            if repo.get("language"):
+                append(f"Developed {name} in {repo['language']}")
         
         # Skills from languages
         if "languages" in profile_data:
-            lang_list = ", ".join(sorted(profile_data["languages"].keys()))
-            bullets.append(f"Proficient in programming languages: {lang_list}")
+            append(f"Proficient in programming languages: {', '.join(sorted(profile_data['languages']))}")
         
         # LinkedIn experience
-        if "experience" in profile_data:
-            for exp in profile_data["experience"]:
-                bullet = f"{exp.get('title', '')} at {exp.get('company', '')}"
-                if exp.get("description"):
-                    bullets.append(bullet + f": {exp['description']}")
-                else:
-                    bullets.append(bullet)
+        bullets += [
+            f"{exp.get('title', '')} at {exp.get('company', '')}"
+            + (f": {exp['description']}" if exp.get("description") else "")
+            for exp in profile_data.get("experience", ())
+        ]
         
         # Education
-        if "education" in profile_data:
-            for edu in profile_data["education"]:
-                bullets.append(f"{edu.get('degree', '')} from {edu.get('school', '')}")
+        bullets += [f"{edu.get('degree', '')} from {edu.get('school', '')}" for edu in profile_data.get("education", ())]
         
         # Publications
-        if "publications" in profile_data:
-            for pub in profile_data["publications"]:
-                pub_text = f"Published '{pub.get('title', '')}' in {pub.get('venue', '')}"
-                if pub.get("citations", 0) > 0:
-                    pub_text += f" ({pub['citations']} citations)"
-                bullets.append(pub_text)
-                if pub.get("abstract"):
-                    bullets.append(f"Research focus: {pub['abstract'][:200]}")
+        for pub in profile_data.get("publications", ()):
+            citations = pub.get("citations", 0)
+            cite_suffix = f" ({citations} citations)" if citations > 0 else ""
+            append(f"Published '{pub.get('title', '')}' in {pub.get('venue', '')}{cite_suffix}")
+            if pub.get("abstract"):
+                append(f"Research focus: {pub['abstract'][:200]}")
         
         return bullets
     
@@ -221,18 +405,24 @@ class ProfileIngester:
             "bullets": []
         }
         
-        # GitHub
-        print("Ingesting GitHub profile...")
-        combined_data["github"] = self.ingest_github_profile()
-        
-        # LinkedIn (placeholder)
-        print("Ingesting LinkedIn profile...")
-        combined_data["linkedin"] = self.ingest_linkedin_profile()
-        
-        # Google Scholar
-        if scholar_id or author_name:
-            print("Ingesting Google Scholar profile...")
-            combined_data["scholar"] = self.ingest_google_scholar(scholar_id, author_name)
+        # The sources live on independent hosts, so ingest them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            print("Ingesting GitHub profile...")
+            github_future = executor.submit(self.ingest_github_profile)
+            
+            # LinkedIn (placeholder)
+            print("Ingesting LinkedIn profile...")
+            linkedin_future = executor.submit(self.ingest_linkedin_profile)
+            
+            scholar_future = None
+            if scholar_id or author_name:
+                print("Ingesting Google Scholar profile...")
+                scholar_future = executor.submit(self.ingest_google_scholar, scholar_id, author_name)
+            
+            combined_data["github"] = github_future.result()
+            combined_data["linkedin"] = linkedin_future.result()
+            if scholar_future:
+                combined_data["scholar"] = scholar_future.result()
         
         # Convert to bullets
         print("Converting to bullet format...")
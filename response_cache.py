@@ -0,0 +1,52 @@
+"""
+Response Cache Module
+Disk cache for expensive API responses, keyed by a hash of the request inputs
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import time
+from typing import Any, Optional
+
+
+class ResponseCache:
+    """Stores JSON-serializable responses on disk, one file per SHA-256 key"""
+
+    def __init__(self, cache_dir: str = "cache", ttl: Optional[float] = None):
+        """ttl: seconds after which entries are treated as misses (None keeps them forever)"""
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Stable key for the given request inputs"""
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss, expired or unreadable entry"""
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, value: Any):
+        """Write a value atomically so concurrent readers never see a partial file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
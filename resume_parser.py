@@ -3,32 +3,93 @@ Resume Parser Module
 Uses OpenAI API to parse LaTeX resume files and extract bullets
 """
 
+import os
 import json
 import re
-from typing import List, Dict
+import bisect
+import copy
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from typing import List, Dict, Optional
 from pathlib import Path
 from openai import OpenAI
+from batch_api import run_chat_batch
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Bullet extraction
+_ITEM_RE = re.compile(r'\\item\s*([^\n]+(?:\n(?!\\item|\\end)[^\n]+)*)', re.MULTILINE)
+_TEXT_BULLET_RE = re.compile(r'^\s*[-•]\s+(.+?)$')
+_SECTION_SPLIT_RE = re.compile(r'(?=\\section\*?\{)')
+
+# LaTeX cleaning: a command with its optional {argument}; leftover braces go through str.translate
+_LATEX_TOKEN_RE = re.compile(r'\\[a-zA-Z]+\*?(?:\{([^}]*)\})?')
+_BRACE_TABLE = str.maketrans('', '', '{}')
+_WS_RE = re.compile(r'\s+')
+_TEXTBF_RE = re.compile(r'\\textbf\{([^}]+)\}')
+_TEXTIT_RE = re.compile(r'\\textit\{([^}]+)\}')
+_EMPH_RE = re.compile(r'\\emph\{([^}]+)\}')
+
+
+def _unwrap_latex(match) -> str:
+    """Keep a command's argument (itself cleaned of nested commands), drop the command"""
+    argument = match.group(1)
+    return _LATEX_TOKEN_RE.sub(_unwrap_latex, argument) if argument else ""
+
+
+@lru_cache(maxsize=4096)
+def _clean_for_search(text: str) -> str:
+    """Memoized body of ResumeParser._clean_latex_for_search; resume lines repeat across bullet lookups"""
+    # Only remove formatting commands, keep structure
+    text = _TEXTBF_RE.sub(r'\1', text)
+    text = _TEXTIT_RE.sub(r'\1', text)
+    text = _EMPH_RE.sub(r'\1', text)
+    return text.strip()
 
 
 class ResumeParser:
     """Parses LaTeX resume files using AI"""
     
-    def __init__(self, tex_file_path: str, api_key: str = None, model: str = "gpt-4o-mini"):
-        """Initialize parser with OpenAI API key"""
+    _EXTRACT_SYSTEM_PROMPT = """You are an expert at parsing LaTeX resumes. Extract all bullet points from the resume content.
+
+For each bullet point found, extract:
+- The bullet text content (cleaned of LaTeX formatting but preserving meaning)
+- The original LaTeX code including the bullet marker (e.g., "\\item ..." or "- ...")
+- The section/context where it appears (e.g., "Experience", "Projects", "Education")
+
+Return a JSON array of bullet objects. Each bullet should have:
+- text: The cleaned text content (human-readable, no LaTeX commands)
+- original_latex: The original LaTeX code as it appears in the document
+- section: The section name where this bullet appears (or "Unknown")
+- index: A unique index number starting from 0
+
+Return ONLY valid JSON, no other text."""
+    
+    # Chunks of the resume sent per extraction request (~6000 tokens at ~4 characters per token)
+    CHUNK_MAX_CHARS = 24000
+    MAX_WORKERS = 4
+    
+    def __init__(self, tex_file_path: str, api_key: str = None, model: str = "gpt-4o-mini",
+                 http_client: Optional[httpx.Client] = None):
+        """Initialize parser with OpenAI API key (http_client: optional shared httpx client)"""
         self.tex_file_path = Path(tex_file_path)
         self.content = ""
         self.bullets = []
         self.bullet_positions = []  # (start_line, end_line, original_text)
         
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         else:
             # Try to get from environment
-            import os
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OpenAI API key required. Provide via api_key parameter or OPENAI_API_KEY env var")
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
         
         self.model = model
         
@@ -50,106 +111,17 @@ class ResumeParser:
         self.bullets = []
         self.bullet_positions = []
         
-        system_prompt = """You are an expert at parsing LaTeX resumes. Extract all bullet points from the resume content.
-
-For each bullet point found, extract:
-- The bullet text content (cleaned of LaTeX formatting but preserving meaning)
-- The original LaTeX code including the bullet marker (e.g., "\\item ..." or "- ...")
-- The section/context where it appears (e.g., "Experience", "Projects", "Education")
-
-Return a JSON array of bullet objects. Each bullet should have:
-- text: The cleaned text content (human-readable, no LaTeX commands)
-- original_latex: The original LaTeX code as it appears in the document
-- section: The section name where this bullet appears (or "Unknown")
-- index: A unique index number starting from 0
-
-Return ONLY valid JSON, no other text."""
-
-        # Limit content to avoid token limits
-        content_sample = self.content[:8000] if len(self.content) > 8000 else self.content
-        
-        user_prompt = f"""Extract all bullet points from this LaTeX resume:
-
-{content_sample}
-
-Return as a JSON object with a "bullets" key containing an array of bullet objects. Each bullet should have:
-- "text": cleaned text content
-- "original_latex": original LaTeX code
-- "section": section name
-- "index": unique index
-
-Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "...", "index": 0}}, ...]}}"""
-
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},  # Force JSON output
-                temperature=0.1
-            )
-            
-            # Parse JSON response
-            content = response.choices[0].message.content
-            result = json.loads(content)
-            
-            # Handle both array and object with array
-            if isinstance(result, dict):
-                bullets_data = result.get("bullets", result.get("items", result.get("bullet_points", [])))
-            elif isinstance(result, list):
-                bullets_data = result
+            # Send the whole resume, split at \section boundaries into chunks that fit one request;
+            # chunks are extracted concurrently and merged back in document order
+            chunks = self._section_chunks(self.content)
+            if len(chunks) == 1:
+                chunk_results = [self._request_bullets(chunks[0])]
             else:
-                bullets_data = []
-            
-            # Convert to our format and find positions in original content
-            lines = self.content.split('\n')
+                with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(chunks))) as executor:
+                    chunk_results = list(executor.map(self._request_bullets, chunks))
             
-            for i, bullet_data in enumerate(bullets_data):
-                bullet_text = bullet_data.get("text", "").strip()
-                original_latex = bullet_data.get("original_latex", "")
-                section = bullet_data.get("section", "Unknown")
-                
-                if len(bullet_text) < 10:  # Skip very short bullets
-                    continue
-                
-                # Find position in original content
-                start_pos = self.content.find(original_latex) if original_latex else -1
-                end_pos = start_pos + len(original_latex) if start_pos >= 0 else -1
-                
-                if start_pos < 0:
-                    # Fallback: try to find by text content
-                    bullet_text_clean = self._clean_latex_for_search(bullet_text)
-                    for j, line in enumerate(lines):
-                        if bullet_text_clean.lower() in self._clean_latex_for_search(line).lower():
-                            start_pos = sum(len(l) + 1 for l in lines[:j])
-                            end_pos = start_pos + len(line)
-                            start_line = j
-                            end_line = j
-                            break
-                    else:
-                        start_line = 0
-                        end_line = 0
-                else:
-                    start_line = self.content[:start_pos].count('\n')
-                    end_line = self.content[:end_pos].count('\n')
-                
-                bullet_dict = {
-                    "text": bullet_text,
-                    "original_latex": original_latex if original_latex else f"\\item {bullet_text}",
-                    "start_line": start_line,
-                    "end_line": end_line,
-                    "start_pos": start_pos,
-                    "end_pos": end_pos,
-                    "type": "item" if "\\item" in original_latex.lower() else "text",
-                    "section": section,
-                    "index": i
-                }
-                
-                self.bullets.append(bullet_dict)
-                if start_pos >= 0:
-                    self.bullet_positions.append((start_pos, end_pos, original_latex))
+            self._build_bullets(self._merge_chunk_bullets(chunk_results))
             
             # If AI parsing didn't work well, fall back to regex
             if len(self.bullets) == 0:
@@ -168,20 +140,207 @@ Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "..."
             print("Falling back to regex parsing...")
             return self._fallback_extract_bullets()
     
+    def extract_bullets_batch(self, resume_paths: List[str], poll_interval: float = 30.0,
+                              timeout: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """
+        Extract bullets from many resumes in one OpenAI Batch API job (about half the cost, results
+        within 24h) for offline bulk runs; extract_bullets remains the interactive path
+        Returns resume path -> bullets; resumes whose requests failed use the regex fallback
+        """
+        parsers = [self._for_resume(path) for path in resume_paths]
+        requests = {}
+        request_ids = []
+        for n, parser in enumerate(parsers):
+            ids = []
+            for c, chunk in enumerate(parser._section_chunks(parser.content)):
+                custom_id = f"resume-{n}-chunk-{c}"
+                requests[custom_id] = parser._extract_request(chunk)
+                ids.append(custom_id)
+            request_ids.append(ids)
+        
+        results = run_chat_batch(self.client, requests, poll_interval=poll_interval, timeout=timeout)
+        
+        extracted = {}
+        for path, parser, ids in zip(resume_paths, parsers, request_ids):
+            try:
+                chunk_results = [parser._parse_bullets_response(results[custom_id]) for custom_id in ids]
+                parser._build_bullets(parser._merge_chunk_bullets(chunk_results))
+            except Exception as e:
+                print(f"Error extracting bullets for {path} from batch results: {e}")
+                parser.bullets = []
+            
+            if not parser.bullets:
+                print(f"  Falling back to regex parsing for {path}...")
+                parser._fallback_extract_bullets()
+            extracted[str(path)] = parser.bullets
+        
+        print(f"✓ Extracted bullets from {len(extracted)} resumes using the Batch API")
+        return extracted
+    
+    def _for_resume(self, tex_file_path: str) -> "ResumeParser":
+        """Loaded parser for another resume that shares this parser's client and model"""
+        parser = copy.copy(self)
+        parser.tex_file_path = Path(tex_file_path)
+        parser.bullets = []
+        parser.bullet_positions = []
+        parser.load_resume()
+        return parser
+    
+    def _section_chunks(self, content: str) -> List[str]:
+        """Split content at \\section boundaries, packing sections into chunks of at most CHUNK_MAX_CHARS"""
+        pieces = []
+        for section in _SECTION_SPLIT_RE.split(content):
+            if len(section) <= self.CHUNK_MAX_CHARS:
+                pieces.append(section)
+                continue
+            # Oversized section: fall back to line boundaries
+            current = ""
+            for line in section.splitlines(keepends=True):
+                if current and len(current) + len(line) > self.CHUNK_MAX_CHARS:
+                    pieces.append(current)
+                    current = ""
+                current += line
+            pieces.append(current)
+        
+        chunks = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) > self.CHUNK_MAX_CHARS:
+                chunks.append(current)
+                current = ""
+            current += piece
+        if current or not chunks:
+            chunks.append(current)
+        return chunks
+    
+    def _request_bullets(self, content_sample: str) -> List[Dict]:
+        """Ask the model for the bullets in one chunk of the resume"""
+        response = self.client.chat.completions.create(**self._extract_request(content_sample))
+        return self._parse_bullets_response(response.choices[0].message.content)
+    
+    def _extract_request(self, content_sample: str) -> Dict:
+        """chat.completions.create arguments for extracting the bullets of one chunk"""
+        user_prompt = f"""Extract all bullet points from this LaTeX resume:
+
+{content_sample}
+
+Return as a JSON object with a "bullets" key containing an array of bullet objects. Each bullet should have:
+- "text": cleaned text content
+- "original_latex": original LaTeX code
+- "section": section name
+- "index": unique index
+
+Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "...", "index": 0}}, ...]}}"""
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._EXTRACT_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            "response_format": {"type": "json_object"},  # Force JSON output
+            "temperature": 0.1
+        }
+    
+    @staticmethod
+    def _parse_bullets_response(content: str) -> List[Dict]:
+        """Bullet list from the model's JSON reply"""
+        result = json.loads(content)
+        
+        # Handle both array and object with array
+        if isinstance(result, dict):
+            return result.get("bullets", result.get("items", result.get("bullet_points", [])))
+        elif isinstance(result, list):
+            return result
+        return []
+    
+    @staticmethod
+    def _merge_chunk_bullets(chunk_results: List[List[Dict]]) -> List[Dict]:
+        """Concatenate per-chunk bullets in document order, keeping the first of any repeated snippet"""
+        bullets_data = []
+        seen_latex = set()
+        for chunk_bullets in chunk_results:
+            for bullet_data in chunk_bullets:
+                original_latex = bullet_data.get("original_latex", "")
+                if original_latex:
+                    if original_latex in seen_latex:
+                        continue
+                    seen_latex.add(original_latex)
+                bullets_data.append(bullet_data)
+        
+        return bullets_data
+    
+    def _build_bullets(self, bullets_data: List[Dict]) -> List[Dict]:
+        """Turn model-reported bullets into bullet dicts with their positions in the content"""
+        self.bullets = []
+        self.bullet_positions = []
+        
+        # Convert to our format and find positions in original content
+        lines = self.content.split('\n')
+        offsets = self._line_offsets(lines)
+        latex_positions = self._find_all([b.get("original_latex", "") for b in bullets_data])
+        
+        for i, bullet_data in enumerate(bullets_data):
+            bullet_text = bullet_data.get("text", "").strip()
+            original_latex = bullet_data.get("original_latex", "")
+            section = bullet_data.get("section", "Unknown")
+            
+            if len(bullet_text) < 10:  # Skip very short bullets
+                continue
+            
+            # Find position in original content
+            start_pos = latex_positions.get(original_latex, -1) if original_latex else -1
+            end_pos = start_pos + len(original_latex) if start_pos >= 0 else -1
+            
+            if start_pos < 0:
+                # Fallback: try to find by text content
+                bullet_text_clean = self._clean_latex_for_search(bullet_text).lower()
+                for j, line in enumerate(lines):
+                    if bullet_text_clean in self._clean_latex_for_search(line).lower():
+                        start_pos = offsets[j]
+                        end_pos = start_pos + len(line)
+                        start_line = j
+                        end_line = j
+                        break
+                else:
+                    start_line = 0
+                    end_line = 0
+            else:
+                start_line = bisect.bisect_right(offsets, start_pos) - 1
+                end_line = bisect.bisect_right(offsets, end_pos) - 1
+            
+            bullet_dict = {
+                "text": bullet_text,
+                "original_latex": original_latex if original_latex else f"\\item {bullet_text}",
+                "start_line": start_line,
+                "end_line": end_line,
+                "start_pos": start_pos,
+                "end_pos": end_pos,
+                "type": "item" if "\\item" in original_latex.lower() else "text",
+                "section": section,
+                "index": i
+            }
+            
+            self.bullets.append(bullet_dict)
+            if start_pos >= 0:
+                self.bullet_positions.append((start_pos, end_pos, original_latex))
+        
+        return self.bullets
+    
     def _fallback_extract_bullets(self) -> List[Dict]:
         """Fallback regex-based extraction if AI parsing fails"""
         self.bullets = []
         lines = self.content.split('\n')
+        offsets = self._line_offsets(lines)
         
         # Extract \item entries
-        item_pattern = r'\\item\s*([^\n]+(?:\n(?!\\item|\\end)[^\n]+)*)'
-        for match in re.finditer(item_pattern, self.content, re.MULTILINE):
+        for match in _ITEM_RE.finditer(self.content):
             bullet_text = match.group(1).strip()
             bullet_text = self._clean_latex(bullet_text)
             
             if len(bullet_text) > 10:
-                start_line = self.content[:match.start()].count('\n')
-                end_line = self.content[:match.end()].count('\n')
+                start_line = bisect.bisect_right(offsets, match.start()) - 1
+                end_line = bisect.bisect_right(offsets, match.end()) - 1
                 
                 bullet_dict = {
                     "text": bullet_text,
@@ -197,22 +356,23 @@ Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "..."
                 
                 self.bullets.append(bullet_dict)
         
-        # Extract text bullets
-        text_bullet_pattern = r'^\s*[-•]\s+(.+?)$'
+        # Extract text bullets, skipping any text already collected
+        seen = {b["text"] for b in self.bullets}
         for i, line in enumerate(lines):
-            match = re.match(text_bullet_pattern, line)
+            match = _TEXT_BULLET_RE.match(line)
             if match:
                 bullet_text = match.group(1).strip()
                 bullet_text = self._clean_latex(bullet_text)
                 
-                if len(bullet_text) > 10 and not any(b["text"] == bullet_text for b in self.bullets):
+                if len(bullet_text) > 10 and bullet_text not in seen:
+                    seen.add(bullet_text)
                     bullet_dict = {
                         "text": bullet_text,
                         "original_latex": line,
                         "start_line": i,
                         "end_line": i,
-                        "start_pos": sum(len(l) + 1 for l in lines[:i]),
-                        "end_pos": sum(len(l) + 1 for l in lines[:i+1]),
+                        "start_pos": offsets[i],
+                        "end_pos": offsets[i + 1],
                         "type": "text",
                         "section": "Unknown",
                         "index": len(self.bullets)
@@ -222,29 +382,45 @@ Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "..."
         print(f"  Extracted {len(self.bullets)} bullets using regex fallback")
         return self.bullets
     
-    def _clean_latex(self, text: str) -> str:
-        """Remove LaTeX commands while preserving content"""
-        # Remove LaTeX commands like \textbf{}, \textit{}, etc.
-        text = re.sub(r'\\[a-zA-Z]+\{([^}]+)\}', r'\1', text)
+    def _find_all(self, patterns: List[str]) -> Dict[str, int]:
+        """First start offset of each pattern in the content, from a single Aho-Corasick scan"""
+        patterns = {p for p in patterns if p}
+        if ahocorasick is None or not patterns:
+            # Without pyahocorasick, fall back to one str.find per pattern
+            positions = {p: self.content.find(p) for p in patterns}
+            return {p: pos for p, pos in positions.items() if pos >= 0}
         
-        # Remove standalone commands
-        text = re.sub(r'\\[a-zA-Z]+\*?', '', text)
+        automaton = ahocorasick.Automaton()
+        for pattern in patterns:
+            automaton.add_word(pattern, pattern)
+        automaton.make_automaton()
         
-        # Remove braces
-        text = re.sub(r'[{}]', '', text)
+        positions = {}
+        for end_idx, pattern in automaton.iter(self.content):
+            positions.setdefault(pattern, end_idx - len(pattern) + 1)
+        return positions
+    
+    @staticmethod
+    def _line_offsets(lines: List[str]) -> List[int]:
+        """Character offset at which each line starts (plus one past the end)"""
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line) + 1)
+        return offsets
+    
+    def _clean_latex(self, text: str) -> str:
+        """Remove LaTeX commands while preserving content"""
+        # Unwrap \textbf{...} and friends and drop standalone commands, then strip braces
+        text = _LATEX_TOKEN_RE.sub(_unwrap_latex, text).translate(_BRACE_TABLE)
         
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', text).strip()
         
         return text
     
     def _clean_latex_for_search(self, text: str) -> str:
         """Clean LaTeX for searching (less aggressive than _clean_latex)"""
-        # Only remove formatting commands, keep structure
-        text = re.sub(r'\\textbf\{([^}]+)\}', r'\1', text)
-        text = re.sub(r'\\textit\{([^}]+)\}', r'\1', text)
-        text = re.sub(r'\\emph\{([^}]+)\}', r'\1', text)
-        return text.strip()
+        return _clean_for_search(text)
     
     def replace_bullet(self, old_bullet: Dict, new_text: str):
         """
@@ -265,9 +441,9 @@ Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "..."
         end = old_bullet["end_pos"]
         
         if start >= 0 and end >= 0:
-            # Find the exact match in content
-            content_slice = self.content[start:end]
-            if content_slice.strip() == old_latex.strip() or old_latex in content_slice:
+            # Find the exact match in content (bounded find avoids copying the slice in the common case)
+            if (self.content.find(old_latex, start, end) >= 0
+                    or self.content[start:end].strip() == old_latex.strip()):
                 self.content = self.content[:start] + new_latex + self.content[end:]
             else:
                 # Try finding by text content
@@ -299,8 +475,13 @@ Format: {{"bullets": [{{"text": "...", "original_latex": "...", "section": "..."
         if output_path is None:
             output_path = self.tex_file_path
         
-        with open(output_path, 'w', encoding='utf-8') as f:
+        # Write-then-rename so an interrupted save never leaves a truncated resume
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write(self.content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
         
         print(f"Saved resume to {output_path}")
     
@@ -3,20 +3,226 @@ Rewrite Engine Module
 Rewrites resume bullets using OpenAI API with profile context
 """
 
+import os
+import re
 import json
-from typing import List, Dict, Optional
-from openai import OpenAI
+import asyncio
+import logging
+import hashlib
+import random
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from batch_api import run_chat_batch
+from response_cache import ResponseCache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# LaTeX sanitizing of rewritten bullets
+_FORMAT_CMD_RE = re.compile(r'\\(?:textbf|textit|emph)\{')
+_LATEX_UNSAFE_TABLE = str.maketrans({
+    '{': None, '}': None, '$': None, '#': None, '^': None,
+    '&': 'and', '%': 'percent', '_': ' ',
+})
+_WS_RE = re.compile(r'\s+')
+
+# API failures worth retrying (APITimeoutError is an APIConnectionError)
+_TRANSIENT_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+logger = logging.getLogger(__name__)
+
+# Engines built without an http_client share one OpenAI client (and connection pool) per API key
+_CLIENTS: Dict[str, OpenAI] = {}
+
+
+def _shared_client(api_key: str) -> OpenAI:
+    client = _CLIENTS.get(api_key)
+    if client is None:
+        client = _CLIENTS.setdefault(api_key, OpenAI(api_key=api_key))
+    return client
+
+
+# Prompt slice budgets, in tokens
+JOB_KEYWORDS_MAX_TOKENS = 250
+PROFILE_CONTEXT_MAX_TOKENS = 200
+_CHARS_PER_TOKEN = 4  # Rough English average, used to slice by characters when tiktoken is unavailable
+
+
+@lru_cache(maxsize=8)
+def _encoding_for(model: str):
+    """Tokenizer for the model, or None when tiktoken or its encoding file is unavailable"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # The encoding file is downloaded on first use
+        logger.warning("could not load tokenizer for %s, truncating by characters: %s", model, e)
+        return None
+
+
+@lru_cache(maxsize=256)
+def _truncate_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut text to at most max_tokens tokens of the model's tokenizer"""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+    ids = encoding.encode(text, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return text
+    return encoding.decode(ids[:max_tokens], errors="ignore")
+
+
+class _RateLimiter:
+    """
+    Request and token buckets refilled continuously at the per-minute limits (the scheme of the
+    OpenAI cookbook's parallel processor); either limit may be None to leave it unchecked
+    """
+    
+    def __init__(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.available_request_capacity = requests_per_minute or 0.0
+        self.available_token_capacity = tokens_per_minute or 0.0
+        self.last_update = time.monotonic()
+    
+    def _replenish(self):
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        if self.requests_per_minute:
+            self.available_request_capacity = min(
+                self.requests_per_minute,
+                self.available_request_capacity + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self.available_token_capacity = min(
+                self.tokens_per_minute,
+                self.available_token_capacity + elapsed * self.tokens_per_minute / 60
+            )
+    
+    async def acquire(self, tokens: int):
+        """Wait until one request of about `tokens` tokens fits in both buckets, then take it"""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # A request larger than the bucket still runs
+        while True:
+            self._replenish()
+            requests_ok = not self.requests_per_minute or self.available_request_capacity >= 1
+            tokens_ok = not self.tokens_per_minute or self.available_token_capacity >= tokens
+            if requests_ok and tokens_ok:
+                if self.requests_per_minute:
+                    self.available_request_capacity -= 1
+                if self.tokens_per_minute:
+                    self.available_token_capacity -= tokens
+                return
+            await asyncio.sleep(0.05)
 
 
 class RewriteEngine:
     """Rewrites resume bullets using OpenAI API"""
     
+    _SYSTEM_PROMPT = """You are an expert resume writer specializing in ATS (Applicant Tracking System) optimization. 
+Your task is to rewrite resume bullet points to:
+1. Include relevant keywords from the job description naturally
+2. Incorporate specific achievements and metrics from the user's profile
+3. Use strong action verbs and quantifiable results
+4. Maintain factual accuracy - never invent experiences or skills
+5. Ensure the text is clean and professional (no LaTeX commands, no special characters that break LaTeX)
+
+Return ONLY the rewritten bullet text, nothing else. Keep it concise (one line, under 200 characters if possible)."""
+    
+    # Single-bullet rewrites: every static instruction lives here so requests share a
+    # byte-identical prefix that OpenAI prompt caching can reuse
+    _REWRITE_SYSTEM_PROMPT = _SYSTEM_PROMPT + """
+
+The user message gives, in order: the job description keywords and requirements, the profile strengths to emphasize (if any), the original bullet, relevant profile information (use as evidence, but maintain accuracy), and optional recommendations and additional context.
+
+INSTRUCTIONS:
+- Incorporate relevant keywords from the job description naturally
+- Use specific details from the profile information when available
+- Emphasize profile strengths that match job requirements
+- Include metrics and achievements (numbers, percentages, scale)
+- Use strong action verbs (e.g., "Developed", "Implemented", "Led", "Optimized")
+- Maintain factual accuracy - ONLY use information from the profile provided
+- Never invent skills, experiences, or metrics that aren't in the profile
+- Keep it concise and impactful (one line, under 200 characters)
+- Do NOT include LaTeX formatting or special characters"""
+    
+    _COVER_LETTER_SYSTEM_PROMPT = """You are a professional cover letter writer.
+
+Write a professional cover letter for the job application described by the user (job description, candidate profile highlights and role match score).
+
+INSTRUCTIONS:
+- Write a concise, professional cover letter (3-4 paragraphs)
+- Highlight relevant experience and skills that match the job
+- Show enthusiasm for the role and company
+- Include specific achievements from the profile
+- Maintain a professional but engaging tone
+- Do NOT invent experiences
+
+Return only the cover letter."""
+    
+    _RECRUITER_MESSAGE_SYSTEM_PROMPT = """You are a professional networker writing LinkedIn messages.
+
+Write a brief, professional LinkedIn message to a recruiter for the position described by the user.
+
+INSTRUCTIONS:
+- Keep it concise (2-3 sentences)
+- Express interest in the role
+- Mention one key qualification or achievement
+- Professional and friendly tone
+- Include a call to action
+
+Return only the LinkedIn message."""
+    
     def __init__(self, api_key: str, model: str = "gpt-4-turbo-preview", 
-                 temperature: float = 0.3, max_tokens: int = 500):
-        self.client = OpenAI(api_key=api_key)
+                 temperature: float = 0.3, max_tokens: int = 500,
+                 http_client: Optional[httpx.Client] = None, max_concurrency: int = 8,
+                 max_requests_per_minute: Optional[float] = None,
+                 max_tokens_per_minute: Optional[float] = None, max_attempts: int = 5,
+                 cache_dir: Optional[str] = "cache", cache_ttl: Optional[float] = None,
+                 cheap_model: str = "gpt-4o-mini", http_limits: Optional[httpx.Limits] = None):
+        """
+        http_client: optional shared httpx client so several components reuse one connection pool;
+                     without one, engines with the same api_key reuse a process-wide client
+        http_limits: connection limits for the async path's pool (match http_client's; defaults
+                     to max_concurrency connections)
+        max_concurrency: requests in flight at once in rewrite_bullets_async
+        max_requests_per_minute / max_tokens_per_minute: account limits the async path stays under
+        max_attempts: tries per request, retrying on 429, timeouts, connection errors and 5xx
+                      responses (async requests only until the first token has streamed)
+        cache_dir: on-disk cache of bullet rewrites (None disables it)
+        cheap_model: model for short utility generations such as recruiter messages
+        """
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self._rate_limiter = (_RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+                              if max_requests_per_minute or max_tokens_per_minute else None)
+        self.client = OpenAI(api_key=api_key, http_client=http_client) if http_client else _shared_client(api_key)
+        self.http_limits = http_limits or httpx.Limits(max_connections=max(1, max_concurrency),
+                                                       max_keepalive_connections=max(1, max_concurrency))
+        self._http_timeout = http_client.timeout if http_client else httpx.Timeout(60)
         self.model = model
+        self.cheap_model = cheap_model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.cache = ResponseCache(os.path.join(cache_dir, "rewrite_engine"), ttl=cache_ttl) if cache_dir else None
+        self._rec_cache = None  # (match_analysis, prelowered recommendations)
+        
+        # One prompt_cache_key for every request from this engine routes them to the same cache
+        # shard, so the shared system-prompt prefix stays warm across bullets and documents
+        cache_key = hashlib.sha1((self.model + self._SYSTEM_PROMPT).encode("utf-8")).hexdigest()[:16]
+        self._cache_routing = {"prompt_cache_key": cache_key}
     
     def rewrite_bullet(self, bullet: Dict, job_keywords: str, 
                       relevant_profile_entries: List[Dict],
@@ -27,42 +233,20 @@ class RewriteEngine:
         Rewrite a single bullet point with job context and profile evidence
         Enhanced with profile match analysis
         """
-        
-        # Prepare profile context
-        profile_context = self._prepare_profile_context(relevant_profile_entries)
-        
-        # Add recommendations and strengths from match analysis
-        enhancement_guidance = ""
-        if match_analysis:
-            strengths = match_analysis.get("strengths", [])
-            if strengths:
-                enhancement_guidance += f"\n\nPROFILE STRENGTHS TO EMPHASIZE: {', '.join(strengths[:5])}"
-            
-            # Find relevant recommendations for this bullet
-            for rec in match_analysis.get("recommendations", []):
-                skill_or_topic = rec.get("skill_or_topic", "").lower()
-                if skill_or_topic and skill_or_topic in bullet["text"].lower():
-                    enhancement_guidance += f"\n\nRECOMMENDATION: {rec.get('suggestion', '')}"
-                    enhancement_guidance += f"\nEVIDENCE: {rec.get('evidence', '')}"
-        
-        # Create prompt
-        prompt = self._create_rewrite_prompt(
-            bullet_text=bullet["text"],
-            job_keywords=job_keywords,
-            profile_context=profile_context,
-            context=original_bullet_context,
-            enhancement_guidance=enhancement_guidance
-        )
+        messages = self._build_rewrite_messages(bullet, job_keywords, relevant_profile_entries,
+                                                original_bullet_context, match_analysis)
+        cache_key = self._rewrite_cache_key(messages)
+        cached = self._cache_get(cache_key)
+        if cached:
+            return cached
         
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_with_retry(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                extra_body=self._cache_routing
             )
             
             rewritten = response.choices[0].message.content.strip()
@@ -70,57 +254,423 @@ class RewriteEngine:
             # Clean up LaTeX unsafe characters if needed
             rewritten = self._sanitize_latex(rewritten)
             
+            self._cache_set(cache_key, rewritten)
             return rewritten
             
-        except Exception as e:
-            print(f"Error rewriting bullet: {e}")
+        except Exception:
+            logger.exception("rewrite failed for bullet=%r", bullet.get("text", "")[:80])
             return bullet["text"]  # Return original on error
     
-    def _get_system_prompt(self) -> str:
-        """System prompt for OpenAI"""
-        return """You are an expert resume writer specializing in ATS (Applicant Tracking System) optimization. 
-Your task is to rewrite resume bullet points to:
-1. Include relevant keywords from the job description naturally
-2. Incorporate specific achievements and metrics from the user's profile
-3. Use strong action verbs and quantifiable results
-4. Maintain factual accuracy - never invent experiences or skills
-5. Ensure the text is clean and professional (no LaTeX commands, no special characters that break LaTeX)
-
-Return ONLY the rewritten bullet text, nothing else. Keep it concise (one line, under 200 characters if possible)."""
+    async def arewrite_bullet(self, client: AsyncOpenAI, bullet: Dict, job_keywords: str,
+                              relevant_profile_entries: List[Dict],
+                              original_bullet_context: str = "",
+                              match_analysis: Dict = None,
+                              profile_capabilities: Dict = None,
+                              on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Async rewrite_bullet using the given AsyncOpenAI client (see new_async_client)
+        The completion is streamed; on_token, if given, receives each text delta as it arrives
+        """
+        messages = self._build_rewrite_messages(bullet, job_keywords, relevant_profile_entries,
+                                                original_bullet_context, match_analysis)
+        cache_key = self._rewrite_cache_key(messages)
+        cached = self._cache_get(cache_key)
+        if cached:
+            return cached
+        
+        # Rough token estimate (~4 characters per token) plus the completion budget
+        estimated_tokens = sum(len(m["content"]) for m in messages) // 4 + self.max_tokens
+        
+        for attempt in range(self.max_attempts):
+            chunks = []
+            try:
+                if self._rate_limiter:
+                    await self._rate_limiter.acquire(estimated_tokens)
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    extra_body=self._cache_routing,
+                    stream=True
+                )
+                async for event in stream:
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        if on_token:
+                            on_token(delta)
+                rewritten = self._sanitize_latex("".join(chunks).strip())
+                self._cache_set(cache_key, rewritten)
+                return rewritten
+            except _TRANSIENT_ERRORS:
+                # Tokens already passed to on_token can't be taken back, so don't retry mid-stream
+                if attempt + 1 == self.max_attempts or chunks:
+                    logger.exception("rewrite failed for bullet=%r", bullet.get("text", "")[:80])
+                    break
+                await asyncio.sleep(2 ** attempt + random.random())
+            except Exception:
+                logger.exception("rewrite failed for bullet=%r", bullet.get("text", "")[:80])
+                break
+        
+        return bullet["text"]  # Return original on error
     
-    def _create_rewrite_prompt(self, bullet_text: str, job_keywords: str,
-                              profile_context: str, context: str = "",
-                              enhancement_guidance: str = "") -> str:
-        """Create the rewrite prompt with profile analysis guidance"""
-        prompt = f"""Rewrite this resume bullet point to better match the job description while incorporating relevant profile information.
-
-ORIGINAL BULLET:
-{bullet_text}
+    async def rewrite_bullets_async(self, bullets: List[Dict], job_keywords: str,
+                                    relevant_profile_entries: List[List[Dict]],
+                                    match_analysis: Dict = None,
+                                    profile_capabilities: Dict = None,
+                                    on_token: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """
+        Rewrite bullets concurrently, at most max_concurrency requests at a time
+        Results are in input order; a bullet whose rewrite fails keeps its original text
+        on_token, if given, is called with (bullet index, text delta) as completions stream in
+        """
+        if not bullets:
+            return []
+        
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        client = self.new_async_client()
+        
+        async def rewrite_one(index: int, bullet: Dict, entries: List[Dict]) -> str:
+            async with semaphore:
+                return await self.arewrite_bullet(
+                    client,
+                    bullet=bullet,
+                    job_keywords=job_keywords,
+                    relevant_profile_entries=entries,
+                    match_analysis=match_analysis,
+                    profile_capabilities=profile_capabilities,
+                    on_token=(lambda delta: on_token(index, delta)) if on_token else None
+                )
+        
+        try:
+            results = await asyncio.gather(
+                *(rewrite_one(i, bullet, entries)
+                  for i, (bullet, entries) in enumerate(zip(bullets, relevant_profile_entries))),
+                return_exceptions=True
+            )
+        finally:
+            await client.close()
+        
+        return [bullet["text"] if isinstance(result, BaseException) else result
+                for bullet, result in zip(bullets, results)]
+    
+    def rewrite_bullets(self, bullets: List[Dict], job_keywords: str,
+                        relevant_profile_entries: List[List[Dict]],
+                        match_analysis: Dict = None,
+                        profile_capabilities: Dict = None,
+                        on_token: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """
+        Synchronous wrapper around rewrite_bullets_async
+        Called from a thread that already runs an event loop (Jupyter, async hosts), asyncio.run
+        would raise, so the rewrites run on a fresh loop in a worker thread instead
+        """
+        coroutine = self.rewrite_bullets_async(
+            bullets, job_keywords, relevant_profile_entries,
+            match_analysis=match_analysis,
+            profile_capabilities=profile_capabilities,
+            on_token=on_token
+        )
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    def rewrite_bullets_batch(self, bullets: List[Dict], job_keywords: str,
+                              relevant_profile_entries: List[List[Dict]],
+                              match_analysis: Dict = None,
+                              profile_capabilities: Dict = None,
+                              poll_interval: float = 30.0,
+                              timeout: Optional[float] = None) -> List[str]:
+        """
+        Rewrite bullets through the OpenAI Batch API (half the cost, separate rate limits, results
+        within 24h) for offline runs; bullets whose request failed keep their original text
+        """
+        requests = {}
+        for i, (bullet, entries) in enumerate(zip(bullets, relevant_profile_entries)):
+            requests[f"bullet_{i}"] = {
+                "model": self.model,
+                "messages": self._build_rewrite_messages(bullet, job_keywords, entries,
+                                                         match_analysis=match_analysis),
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                **self._cache_routing
+            }
+        
+        try:
+            results = run_chat_batch(self.client, requests, poll_interval=poll_interval, timeout=timeout)
+        except Exception:
+            logger.exception("batch rewrite failed for %d bullets", len(requests))
+            results = {}
+        
+        rewritten = []
+        for i, bullet in enumerate(bullets):
+            content = results.get(f"bullet_{i}")
+            rewritten.append(self._sanitize_latex(content.strip()) if content else bullet["text"])
+        return rewritten
+    
+    def _rewrite_cache_key(self, messages: List[Dict]) -> Optional[str]:
+        """Cache key for a rewrite request; None when caching is off or sampling is too random to reuse"""
+        if not self.cache or self.temperature > 0.3:
+            return None
+        return ResponseCache.make_key("rewrite", self.model, str(self.temperature), str(self.max_tokens),
+                                      *(m["content"] for m in messages))
+    
+    def _cache_get(self, cache_key: Optional[str]) -> Optional[str]:
+        """Cached rewrite for the key; an unreadable cache counts as a miss"""
+        if not cache_key:
+            return None
+        try:
+            return self.cache.get(cache_key)
+        except OSError:
+            logger.exception("rewrite cache read failed")
+            return None
+    
+    def _cache_set(self, cache_key: Optional[str], rewritten: str):
+        """Store a rewrite; a failed write is logged so the paid-for result is still returned"""
+        if not cache_key:
+            return
+        try:
+            self.cache.set(cache_key, rewritten)
+        except OSError:
+            logger.exception("rewrite cache write failed")
+    
+    def _create_with_retry(self, **kwargs):
+        """
+        chat.completions.create with exponential backoff and jitter on transient failures
+        (429, timeouts, connection errors, 5xx); other errors and the last failure are raised
+        """
+        # The client's own quick retries are disabled so attempts don't multiply
+        completions = self.client.with_options(max_retries=0).chat.completions
+        for attempt in range(self.max_attempts):
+            try:
+                return completions.create(**kwargs)
+            except _TRANSIENT_ERRORS as e:
+                if attempt + 1 == self.max_attempts:
+                    raise
+                delay = min(2 ** attempt, 30) + random.random()
+                logger.warning("transient API error (%s), retrying in %.1fs", type(e).__name__, delay)
+                time.sleep(delay)
+    
+    def new_async_client(self) -> AsyncOpenAI:
+        """
+        Create an AsyncOpenAI client for one event loop run
+        Its connection pool is bound to the loop, so close it before the loop ends
+        """
+        # The SDK's own retries are off: arewrite_bullet retries, and the two would multiply
+        http_client = httpx.AsyncClient(limits=self.http_limits, timeout=self._http_timeout)
+        return AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+    
+    def _build_rewrite_messages(self, bullet: Dict, job_keywords: str,
+                                relevant_profile_entries: List[Dict],
+                                original_bullet_context: str = "",
+                                match_analysis: Dict = None) -> List[Dict]:
+        """Chat messages for rewriting one bullet"""
+        # Prepare profile context
+        profile_context = self._prepare_profile_context(relevant_profile_entries)
+        
+        # Strengths are the same for every bullet; recommendations depend on the bullet
+        strengths = match_analysis.get("strengths", [])[:5] if match_analysis else []
+        enhancement_guidance = self._recommendation_guidance(bullet, match_analysis)
+        
+        # Create prompt
+        prompt = self._create_rewrite_prompt(
+            bullet_text=bullet["text"],
+            job_keywords=job_keywords,
+            profile_context=profile_context,
+            context=original_bullet_context,
+            enhancement_guidance=enhancement_guidance,
+            strengths=strengths
+        )
+        
+        return [
+            {"role": "system", "content": self._REWRITE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def rewrite_bullets_bulk(self, bullets: List[Dict], job_keywords: str,
+                             relevant_profile_entries: List[List[Dict]],
+                             match_analysis: Dict = None,
+                             profile_capabilities: Dict = None) -> List[str]:
+        """
+        Rewrite many bullets with a single JSON request
+        The system prompt, job keywords and profile strengths are sent once for all bullets;
+        bullets missing from the response fall back to rewrite_bullet
+        """
+        if not bullets:
+            return []
+        
+        rewritten = self._request_bulk_rewrites(bullets, job_keywords, relevant_profile_entries, match_analysis)
+        
+        results = []
+        for i, (bullet, entries) in enumerate(zip(bullets, relevant_profile_entries)):
+            if i in rewritten:
+                results.append(rewritten[i])
+            else:
+                results.append(self.rewrite_bullet(
+                    bullet=bullet,
+                    job_keywords=job_keywords,
+                    relevant_profile_entries=entries,
+                    match_analysis=match_analysis,
+                    profile_capabilities=profile_capabilities
+                ))
+        
+        return results
+    
+    def rewrite_bullets_grouped(self, bullets: List[Dict], job_keywords: str,
+                                relevant_profile_entries: List[List[Dict]],
+                                match_analysis: Dict = None,
+                                profile_capabilities: Dict = None,
+                                group_size: int = 8) -> List[str]:
+        """
+        Rewrite bullets group_size at a time with one JSON request per group, groups in parallel
+        About group_size times fewer requests than the per-bullet path when RPM-bound; bullets
+        missing from a group's response go through rewrite_bullets
+        """
+        if not bullets:
+            return []
+        
+        group_size = max(1, group_size)
+        starts = range(0, len(bullets), group_size)
+        
+        def run_group(start: int) -> Dict[int, str]:
+            end = start + group_size
+            group = self._request_bulk_rewrites(bullets[start:end], job_keywords,
+                                                relevant_profile_entries[start:end], match_analysis)
+            return {start + i: text for i, text in group.items()}
+        
+        rewritten = {}
+        with ThreadPoolExecutor(max_workers=min(max(1, self.max_concurrency), len(starts))) as executor:
+            for group in executor.map(run_group, starts):
+                rewritten.update(group)
+        
+        missing = [i for i in range(len(bullets)) if i not in rewritten]
+        if missing:
+            retried = self.rewrite_bullets(
+                [bullets[i] for i in missing],
+                job_keywords,
+                [relevant_profile_entries[i] for i in missing],
+                match_analysis=match_analysis,
+                profile_capabilities=profile_capabilities
+            )
+            rewritten.update(zip(missing, retried))
+        
+        return [rewritten[i] for i in range(len(bullets))]
+    
+    def _request_bulk_rewrites(self, bullets: List[Dict], job_keywords: str,
+                               relevant_profile_entries: List[List[Dict]],
+                               match_analysis: Dict = None) -> Dict[int, str]:
+        """Send one JSON request rewriting all given bullets; returns bullet index -> rewrite for those answered"""
+        items = []
+        for i, (bullet, entries) in enumerate(zip(bullets, relevant_profile_entries)):
+            item = {
+                "id": i,
+                "text": bullet["text"],
+                "section": bullet.get("section", "Unknown"),
+                "profile_evidence": _truncate_tokens(self._prepare_profile_context(entries),
+                                                     PROFILE_CONTEXT_MAX_TOKENS, self.model)
+            }
+            guidance = self._recommendation_guidance(bullet, match_analysis).strip()
+            if guidance:
+                item["guidance"] = guidance
+            items.append(item)
+        
+        strengths = match_analysis.get("strengths", [])[:5] if match_analysis else []
+        prompt = f"""Rewrite each resume bullet point below to better match the job description while incorporating its profile evidence.
 
 JOB DESCRIPTION KEYWORDS AND REQUIREMENTS:
-{job_keywords[:1000]}
-
-RELEVANT PROFILE INFORMATION (use as evidence, but maintain accuracy):
-{profile_context[:800]}
+{_truncate_tokens(job_keywords, JOB_KEYWORDS_MAX_TOKENS, self.model)}
 
-{enhancement_guidance}
+{f"PROFILE STRENGTHS TO EMPHASIZE: {', '.join(strengths)}" if strengths else ''}
 
-{f'ADDITIONAL CONTEXT: {context[:200]}' if context else ''}
+BULLETS (JSON):
+{json.dumps({"bullets": items})}
 
 INSTRUCTIONS:
+- Rewrite every bullet independently, using only its own "profile_evidence" and "guidance"
 - Incorporate relevant keywords from the job description naturally
-- Use specific details from the profile information when available
-- Emphasize profile strengths that match job requirements
-- Include metrics and achievements (numbers, percentages, scale)
+- Include metrics and achievements (numbers, percentages, scale) when the evidence supports them
 - Use strong action verbs (e.g., "Developed", "Implemented", "Led", "Optimized")
-- Maintain factual accuracy - ONLY use information from the profile provided above
-- Never invent skills, experiences, or metrics that aren't in the profile
-- Keep it concise and impactful (one line, under 200 characters)
+- Never invent skills, experiences, or metrics that aren't in the evidence
+- Keep each bullet concise and impactful (one line, under 200 characters)
 - Do NOT include LaTeX formatting or special characters
 
-Rewritten bullet:"""
+Return a JSON object: {{"results": [{{"id": 0, "rewritten": "..."}}, ...]}} with one entry per bullet id."""
+        
+        rewritten = {}
+        try:
+            response = self._create_with_retry(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self._SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=self.temperature,
+                max_tokens=min(self.max_tokens * len(bullets), 16000),
+                extra_body=self._cache_routing
+            )
+            result = json.loads(response.choices[0].message.content)
+            for entry in result.get("results", []):
+                text = entry.get("rewritten")
+                if (isinstance(entry.get("id"), int) and 0 <= entry["id"] < len(bullets)
+                        and isinstance(text, str) and text.strip()):
+                    rewritten[entry["id"]] = self._sanitize_latex(text.strip())
+        except Exception:
+            logger.exception("bulk rewrite failed for %d bullets", len(bullets))
         
-        return prompt
+        return rewritten
+    
+    def _recommendation_guidance(self, bullet: Dict, match_analysis: Dict = None) -> str:
+        """Recommendation and evidence lines from match analysis that apply to this bullet"""
+        if not match_analysis:
+            return ""
+        
+        guidance = ""
+        bullet_lower = bullet["text"].lower()
+        for skill_or_topic, suggestion, evidence in self._prelowered_recommendations(match_analysis):
+            if skill_or_topic in bullet_lower:
+                guidance += f"\n\nRECOMMENDATION: {suggestion}"
+                guidance += f"\nEVIDENCE: {evidence}"
+        return guidance
+    
+    def _prelowered_recommendations(self, match_analysis: Dict) -> List[Tuple[str, str, str]]:
+        """(lowercased skill_or_topic, suggestion, evidence) per recommendation, built once per match analysis"""
+        if self._rec_cache is not None and self._rec_cache[0] is match_analysis:
+            return self._rec_cache[1]
+        
+        recs = []
+        for rec in match_analysis.get("recommendations", []):
+            skill_or_topic = rec.get("skill_or_topic", "").lower()
+            if skill_or_topic:
+                recs.append((skill_or_topic, rec.get("suggestion", ""), rec.get("evidence", "")))
+        
+        self._rec_cache = (match_analysis, recs)
+        return recs
+    
+    def _create_rewrite_prompt(self, bullet_text: str, job_keywords: str,
+                              profile_context: str, context: str = "",
+                              enhancement_guidance: str = "", strengths: List[str] = None) -> str:
+        """
+        Create the rewrite prompt with profile analysis guidance
+        Ordered from shared to per-bullet content (job, strengths, bullet, evidence) so consecutive
+        requests for the same job share the longest possible cached prefix
+        """
+        job_keywords = _truncate_tokens(job_keywords, JOB_KEYWORDS_MAX_TOKENS, self.model)
+        parts = [f"JOB DESCRIPTION KEYWORDS AND REQUIREMENTS:\n{job_keywords}"]
+        if strengths:
+            parts.append(f"PROFILE STRENGTHS TO EMPHASIZE: {', '.join(strengths)}")
+        parts.append(f"ORIGINAL BULLET:\n{bullet_text}")
+        profile_context = _truncate_tokens(profile_context, PROFILE_CONTEXT_MAX_TOKENS, self.model)
+        parts.append(f"RELEVANT PROFILE INFORMATION:\n{profile_context}")
+        if enhancement_guidance.strip():
+            parts.append(enhancement_guidance.strip())
+        if context:
+            parts.append(f"ADDITIONAL CONTEXT: {context[:200]}")
+        
+        return "\n\n".join(parts)
     
     def _prepare_profile_context(self, relevant_entries: List[Dict]) -> str:
         """Prepare profile entries as context text"""
@@ -139,31 +689,21 @@ Rewritten bullet:"""
     def _sanitize_latex(self, text: str) -> str:
         """Remove or escape LaTeX-unsafe characters"""
         # Remove LaTeX commands that might have been generated
-        text = text.replace('\\textbf{', '').replace('\\textit{', '').replace('\\emph{', '')
-        text = text.replace('{', '').replace('}', '')
-        
-        # Remove special LaTeX characters that could break compilation
-        # But keep common punctuation
-        text = text.replace('&', 'and')
-        text = text.replace('%', 'percent')
-        text = text.replace('$', '')
-        text = text.replace('#', '')
-        text = text.replace('^', '')
-        text = text.replace('_', ' ')  # Replace underscore with space
+        text = _FORMAT_CMD_RE.sub('', text)
         
-        # Clean up multiple spaces
-        import re
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Drop braces and characters that could break compilation (keeping common punctuation)
+        # in a single pass
+        text = text.translate(_LATEX_UNSAFE_TABLE)
         
-        return text
+        # Clean up multiple spaces
+        return _WS_RE.sub(' ', text).strip()
     
     def generate_cover_letter(self, job_description: Dict, user_profile: Dict, 
                             role_match_score: float) -> str:
         """Generate a cover letter based on job description and profile"""
         
-        prompt = f"""Write a professional cover letter for this job application.
-
-JOB DESCRIPTION:
+        # Instructions are static and live in the system prompt; only per-job details go here
+        prompt = f"""JOB DESCRIPTION:
 Role: {job_description.get('role', 'N/A')}
 Company: {job_description.get('company', 'N/A')}
 Key Requirements: {', '.join(job_description.get('requirements', [])[:5])}
@@ -171,67 +711,48 @@ Key Requirements: {', '.join(job_description.get('requirements', [])[:5])}
 CANDIDATE PROFILE HIGHLIGHTS:
 {self._summarize_profile(user_profile)}
 
-ROLE MATCH SCORE: {role_match_score}% (based on resume analysis)
-
-INSTRUCTIONS:
-- Write a concise, professional cover letter (3-4 paragraphs)
-- Highlight relevant experience and skills that match the job
-- Show enthusiasm for the role and company
-- Include specific achievements from the profile
-- Maintain a professional but engaging tone
-- Do NOT invent experiences
-
-Cover Letter:"""
+ROLE MATCH SCORE: {role_match_score}% (based on resume analysis)"""
         
         try:
-            response = self.client.chat.completions.create(
+            response = self._create_with_retry(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are a professional cover letter writer."},
+                    {"role": "system", "content": self._COVER_LETTER_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=1000,
+                extra_body=self._cache_routing
             )
             
             return response.choices[0].message.content.strip()
             
-        except Exception as e:
-            print(f"Error generating cover letter: {e}")
+        except Exception:
+            logger.exception("cover letter generation failed for role=%r", job_description.get('role'))
             return "Error generating cover letter. Please try again."
     
     def generate_recruiter_message(self, job_description: Dict, role_match_score: float) -> str:
         """Generate a brief LinkedIn message for recruiters"""
         
-        prompt = f"""Write a brief, professional LinkedIn message to a recruiter for this position.
-
-JOB: {job_description.get('role', 'N/A')} at {job_description.get('company', 'N/A')}
-ROLE MATCH SCORE: {role_match_score}%
-
-INSTRUCTIONS:
-- Keep it concise (2-3 sentences)
-- Express interest in the role
-- Mention one key qualification or achievement
-- Professional and friendly tone
-- Include a call to action
-
-LinkedIn Message:"""
+        prompt = f"""JOB: {job_description.get('role', 'N/A')} at {job_description.get('company', 'N/A')}
+ROLE MATCH SCORE: {role_match_score}%"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._create_with_retry(
+                model=self.cheap_model,  # Two or three sentences do not need the rewrite model
                 messages=[
-                    {"role": "system", "content": "You are a professional networker writing LinkedIn messages."},
+                    {"role": "system", "content": self._RECRUITER_MESSAGE_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=200
+                max_tokens=200,
+                extra_body=self._cache_routing
             )
             
             return response.choices[0].message.content.strip()
             
-        except Exception as e:
-            print(f"Error generating recruiter message: {e}")
+        except Exception:
+            logger.exception("recruiter message generation failed for role=%r", job_description.get('role'))
             return "Error generating message. Please try again."
     
     def _summarize_profile(self, profile: Dict) -> str:
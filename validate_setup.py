@@ -3,6 +3,12 @@ Validation script to check if all dependencies and modules are properly installe
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+
+def _module_found(module_name):
+    """Whether module_name can be located on sys.path"""
+    return find_spec(module_name) is not None
 
 def check_imports():
     """Check if all required modules can be imported"""
@@ -20,17 +26,6 @@ def check_imports():
         ("bs4", "BeautifulSoup4"),
     ]
     
-    print("Checking required modules...")
-    for module_name, display_name in required_modules:
-        try:
-            __import__(module_name)
-            print(f"  ✓ {display_name}")
-        except ImportError as e:
-            print(f"  ✗ {display_name} - NOT FOUND")
-            errors.append(f"{display_name}: {str(e)}")
-    
-    # Check our custom modules
-    print("\nChecking custom modules...")
     custom_modules = [
         "profile_ingester",
         "embedding_store",
@@ -42,9 +37,28 @@ def check_imports():
         "main"
     ]
     
+    # find_spec only locates a module, so heavy packages (torch via sentence-transformers) are not loaded;
+    # the lookups are just sys.path stats, so run them concurrently and report in order afterwards
+    module_names = [name for name, _ in required_modules] + custom_modules
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = dict(zip(module_names, executor.map(_module_found, module_names)))
+    
+    print("Checking required modules...")
+    for module_name, display_name in required_modules:
+        try:
+            if not found[module_name]:
+                raise ImportError(f"No module named '{module_name}'")
+            print(f"  ✓ {display_name}")
+        except ImportError as e:
+            print(f"  ✗ {display_name} - NOT FOUND")
+            errors.append(f"{display_name}: {str(e)}")
+    
+    # Check our custom modules
+    print("\nChecking custom modules...")
     for module_name in custom_modules:
         try:
-            __import__(module_name)
+            if not found[module_name]:
+                raise ImportError(f"No module named '{module_name}'")
             print(f"  ✓ {module_name}")
         except ImportError as e:
             print(f"  ✗ {module_name} - ERROR: {str(e)}")